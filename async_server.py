@@ -0,0 +1,114 @@
+import asyncio
+import struct
+import threading
+import time
+
+from network import TCP_PORT, COMPRESSED_FLAG, MAX_CLIENT_FRAME, FrameDecompressor, decode_msg
+from server import BYTES_RECEIVED, CONNECTIONS, OPEN_CONNECTIONS, SEND_FAILURES, ClientSession, ClientWriter
+
+
+class AsyncClientWriter(ClientWriter):
+    """ClientWriter drained by an asyncio task instead of a thread.
+
+    Queueing, snapshot coalescing and eviction are inherited unchanged; only
+    the drain loop and the transport shutdown differ.
+    """
+
+    def __init__(self, stream: asyncio.StreamWriter, name: str):
+        self.stream = stream
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        super().__init__(None, name)
+
+    def _start(self):
+        self._ready = asyncio.Event()
+        self._task = self.loop.create_task(self._drain())
+
+    def _call_in_loop(self, fn):
+        if threading.get_ident() == self._loop_thread:
+            fn()
+        else:
+            self.loop.call_soon_threadsafe(fn)
+
+    def _wake(self):
+        self._call_in_loop(self._ready.set)
+
+    def _shutdown(self):
+        # Closing the transport ends the reader with EOF, which runs the
+        # session's usual disconnect path.
+        self._call_in_loop(self.stream.close)
+
+    async def _drain(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while True:
+                with self._cond:
+                    if self.closed:
+                        return
+                    if not self._queue:
+                        break
+                    frame, snapshot = self._next_frame_locked()
+                data = self._prepare(frame)
+                start = time.perf_counter()
+                try:
+                    self.stream.write(data)
+                    await self.stream.drain()
+                except (ConnectionError, OSError):
+                    SEND_FAILURES.inc(reason="error")
+                    self.close()
+                    return
+                self._frame_written(snapshot, len(data), time.perf_counter() - start)
+
+
+async def _serve_client(reader: asyncio.StreamReader, stream: asyncio.StreamWriter):
+    addr = stream.get_extra_info("peername")
+    print(f"[TCP] New connection from {addr}")
+    CONNECTIONS.inc()
+    OPEN_CONNECTIONS.inc()
+    writer = AsyncClientWriter(stream, f"{addr[0]}:{addr[1]}")
+    session = ClientSession(writer, addr)
+    inflater = FrameDecompressor(MAX_CLIENT_FRAME)
+
+    try:
+        while True:
+            header = await reader.readexactly(4)
+            msglen = struct.unpack(">I", header)[0]
+            if msglen & ~COMPRESSED_FLAG > MAX_CLIENT_FRAME:
+                break
+            payload = await reader.readexactly(msglen & ~COMPRESSED_FLAG)
+            BYTES_RECEIVED.inc(4 + len(payload))
+            if msglen & COMPRESSED_FLAG:
+                # Only a client that negotiated compression may send it.
+                if writer.compressor is None:
+                    break
+                payload = inflater.decompress(payload)
+                if payload is None:
+                    break
+            msg = decode_msg(payload)
+            if not msg or not session.handle(msg):
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        OPEN_CONNECTIONS.dec()
+        writer.close()
+        stream.close()
+        print(f"[TCP] Connection closed with {addr}")
+        session.close()
+
+
+async def serve_tcp(port: int = TCP_PORT):
+    """Serves the length-prefixed JSON protocol for every client from one event loop.
+
+    Game actions still take the lobby locks shared with the HTTP thread; they
+    are held only for the in-memory update, never across network I/O.
+    """
+    server = await asyncio.start_server(_serve_client, "", port, backlog=1024, reuse_address=True)
+    print(f"[TCP] asyncio server listening on port {port}...")
+    async with server:
+        await server.serve_forever()
+
+
+def run_async_tcp_server():
+    asyncio.run(serve_tcp())
@@ -0,0 +1,116 @@
+"""Compares the flat byte-array board against the original list/set board.
+
+Run from the repository root:
+
+    python benchmarks/bench_board_backend.py [--sizes 16x30,200x200,1000x1000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import MinesweeperEngine  # noqa: E402
+
+
+class ListBoardEngine:
+    """The original nested-list / tuple-set representation, kept as a reference."""
+
+    def __init__(self, rows: int, cols: int, mines: int):
+        self.rows = rows
+        self.cols = cols
+        self.mines_total = mines
+        self.first_click = True
+        self.game_over = False
+        self.mines = set()
+        self.adj = [[0 for _ in range(cols)] for _ in range(rows)]
+        self.revealed = [[False for _ in range(cols)] for _ in range(rows)]
+        self.flags = set()
+
+    def neighbors(self, r: int, c: int):
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                if dr == 0 and dc == 0:
+                    continue
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < self.rows and 0 <= nc < self.cols:
+                    yield nr, nc
+
+    def _place_mines(self, safe_r: int, safe_c: int):
+        forbidden = {(safe_r, safe_c)} | set(self.neighbors(safe_r, safe_c))
+        candidates = [(r, c) for r in range(self.rows) for c in range(self.cols) if (r, c) not in forbidden]
+        self.mines = set(random.sample(candidates, self.mines_total))
+        for r in range(self.rows):
+            for c in range(self.cols):
+                if (r, c) in self.mines:
+                    self.adj[r][c] = -1
+                else:
+                    self.adj[r][c] = sum((nr, nc) in self.mines for nr, nc in self.neighbors(r, c))
+
+    def reveal(self, r: int, c: int):
+        if self.first_click:
+            self._place_mines(r, c)
+            self.first_click = False
+        if (r, c) in self.mines:
+            self.game_over = True
+            return
+        stack = [(r, c)]
+        while stack:
+            cr, cc = stack.pop()
+            if self.revealed[cr][cc] or (cr, cc) in self.flags or (cr, cc) in self.mines:
+                continue
+            self.revealed[cr][cc] = True
+            if self.adj[cr][cc] == 0:
+                for nr, nc in self.neighbors(cr, cc):
+                    if not self.revealed[nr][nc] and (nr, nc) not in self.mines:
+                        stack.append((nr, nc))
+
+
+BACKENDS = {
+    "list": ListBoardEngine,
+    "flat": MinesweeperEngine,
+}
+
+
+def measure(factory, rows: int, cols: int, mines: int, seed: int) -> dict:
+    # Timed and traced separately: tracemalloc slows allocation-heavy code a lot.
+    random.seed(seed)
+    start = time.perf_counter()
+    board = factory(rows, cols, mines)
+    board.reveal(rows // 2, cols // 2)
+    elapsed = time.perf_counter() - start
+    del board
+
+    random.seed(seed)
+    tracemalloc.start()
+    board = factory(rows, cols, mines)
+    board.reveal(rows // 2, cols // 2)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del board
+    return {"first_click_s": elapsed, "retained_bytes": current, "peak_bytes": peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="16x30,200x200,500x500")
+    parser.add_argument("--density", type=float, default=0.15)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    print(f"{'board':>11} {'backend':>7} {'first click':>12} {'retained':>12} {'per cell':>9}")
+    for size in args.sizes.split(","):
+        rows, cols = (int(x) for x in size.lower().split("x"))
+        mines = max(1, int(rows * cols * args.density))
+        for name, factory in BACKENDS.items():
+            result = measure(factory, rows, cols, mines, args.seed)
+            per_cell = result["retained_bytes"] / (rows * cols)
+            print(f"{size:>11} {name:>7} {result['first_click_s'] * 1000:>10.1f}ms "
+                  f"{result['retained_bytes']:>12,} {per_cell:>8.1f}B")
+
+
+if __name__ == "__main__":
+    main()
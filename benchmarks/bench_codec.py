@@ -0,0 +1,74 @@
+"""Compares frame size and encode/decode time of the JSON and binary codecs.
+
+The deflated column is the frame compressed by a fresh per-connection
+compressor, i.e. without any history from earlier frames.
+
+Run from the repository root:
+
+    python benchmarks/bench_codec.py [--sizes 16x30,200x200] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import Difficulty  # noqa: E402
+from network import BINARY, JSON, FrameCompressor, decode_msg, encode_msg  # noqa: E402
+from server import Lobby  # noqa: E402
+
+
+def sample_messages(rows: int, cols: int, seed: int) -> dict:
+    """Snapshots after the opening and near the end, the opening delta and one action."""
+    random.seed(seed)
+    lobby = Lobby("bench", Difficulty.custom(rows, cols, max(1, rows * cols // 6)))
+    lobby.board.ensure_mines(rows // 2, cols // 2)
+    lobby._dirty_cells.extend(lobby.board.flood_reveal(rows // 2, cols // 2))
+    delta = lobby.delta_message()
+    early = lobby.snapshot_message()
+    for r in range(rows):
+        for c in range(cols):
+            if not lobby.board.is_mine(r, c) and not lobby.board.is_revealed(r, c):
+                lobby.board.flood_reveal(r, c)
+    return {
+        "early": early,
+        "late": lobby.snapshot_message(),
+        "delta": delta,
+        "action": {"action": "reveal", "row": rows - 1, "col": cols - 1},
+    }
+
+
+def measure(msg: dict, codec: str, repeat: int) -> tuple[int, int, float, float]:
+    frame = encode_msg(msg, codec)
+    deflated = len(FrameCompressor(threshold=0).compress(frame))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encode_msg(msg, codec)
+    encoded = time.perf_counter()
+    for _ in range(repeat):
+        decode_msg(memoryview(frame)[4:])
+    decoded = time.perf_counter()
+    return len(frame), deflated, (encoded - start) / repeat, (decoded - encoded) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="16x30,200x200")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    print(f"{'board':>9} {'message':>8} {'codec':>6} {'bytes':>10} {'deflated':>10} {'encode':>10} {'decode':>10}")
+    for size in args.sizes.split(","):
+        rows, cols = (int(x) for x in size.lower().split("x"))
+        for name, msg in sample_messages(rows, cols, args.seed).items():
+            for codec in (JSON, BINARY):
+                size_bytes, deflated, enc, dec = measure(msg, codec, args.repeat)
+                print(f"{size:>9} {name:>8} {codec:>6} {size_bytes:>10,} {deflated:>10,} "
+                      f"{enc * 1e6:>8.1f}us {dec * 1e6:>8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
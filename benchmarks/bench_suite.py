@@ -0,0 +1,266 @@
+"""Headless engine and protocol benchmarks with JSON results for comparing commits.
+
+Times mine placement, flood fill, chord, the win check, Lobby.to_dict and the
+network codecs on the preset boards and on synthetic large ones. Every case is
+seeded, so two runs build the same boards. The JSON layout follows
+pytest-benchmark (``benchmarks[].stats.{min,max,mean,stddev,median,...}``).
+
+Run from the repository root:
+
+    python benchmarks/bench_suite.py --json before.json
+    python benchmarks/bench_suite.py --json after.json --compare before.json
+"""
+import argparse
+import datetime
+import functools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from engine import Difficulty, MinesweeperEngine  # noqa: E402
+from network import BINARY, JSON, decode_msg, encode_msg  # noqa: E402
+from server import DIFFICULTIES, Lobby, Player  # noqa: E402
+
+DEFAULT_BOARDS = "Easy,Medium,Hard,200x200,1000x1000"
+DENSITY = 0.15
+
+
+class SkipCase(Exception):
+    """Raised by a case's setup when the case does not apply to the board."""
+
+
+def parse_board(spec: str) -> Difficulty:
+    if spec in DIFFICULTIES:
+        return DIFFICULTIES[spec]
+    rows, cols = (int(x) for x in spec.lower().split("x"))
+    return Difficulty.custom(rows, cols, max(1, int(rows * cols * DENSITY)))
+
+
+def new_engine(diff: Difficulty, seed: int) -> MinesweeperEngine:
+    random.seed(seed)
+    return MinesweeperEngine(diff.rows, diff.cols, diff.mines)
+
+
+def opened_engine(diff: Difficulty, seed: int) -> MinesweeperEngine:
+    """Mines placed around the centre and the opening region revealed."""
+    engine = new_engine(diff, seed)
+    engine.reveal(diff.rows // 2, diff.cols // 2)
+    return engine
+
+
+def chord_cell(engine: MinesweeperEngine) -> int | None:
+    """A revealed number with a covered safe neighbour, i.e. a useful chord, or None."""
+    for i in range(engine.rows * engine.cols):
+        if not engine._revealed[i] or engine._adj[i] <= 0:
+            continue
+        around = engine._neighbor_indices(i)
+        if any(not engine._revealed[ni] and not engine._is_mine_index(ni) for ni in around):
+            return i
+    return None
+
+
+def played_lobby(diff: Difficulty, seed: int, fraction: float = 0.5, players: int = 4) -> Lobby:
+    """A lobby mid-game: about `fraction` of the safe cells open and some mines flagged."""
+    lobby = Lobby("bench", diff)
+    for n in range(players):
+        pid = f"p{n}"
+        lobby.players[pid] = Player(pid, f"Player {n}", "#ef4444", 0, 0.0, n == 0, True)
+    lobby.state = "playing"
+    random.seed(seed)
+    board = lobby.board
+    board.ensure_mines(diff.rows // 2, diff.cols // 2)
+    board.flood_reveal(diff.rows // 2, diff.cols // 2)
+    rng = random.Random(seed)
+    order = list(range(diff.rows * diff.cols))
+    rng.shuffle(order)
+    target = int(board.safe_total * fraction)
+    for i in order:
+        if board.revealed_count >= target:
+            break
+        r, c = divmod(i, diff.cols)
+        if board.is_mine(r, c):
+            if rng.random() < 0.3:
+                board.set_flag(r, c, f"p{i % players}")
+        else:
+            board.flood_reveal(r, c)
+    for n in range(30):
+        lobby.add_chat(f"Player {n % players}", f"message {n}")
+    return lobby
+
+
+def cases(diff: Difficulty, seed: int):
+    """Yields (name, setup, fn, pure): fn(state) is timed; setup() builds state per round.
+
+    Pure cases leave their state untouched, so they share one setup and are
+    repeated inside a round. Shared fixtures are built on first use, so cases
+    left out by --filter cost nothing; setup() raises SkipCase when a case
+    does not apply to the board.
+    """
+    mid_r, mid_c = diff.rows // 2, diff.cols // 2
+
+    def place_setup():
+        return new_engine(diff, seed)
+
+    yield "place_mines", place_setup, lambda e: e._place_mines(mid_r, mid_c), False
+
+    def flood_setup():
+        engine = new_engine(diff, seed)
+        engine.ensure_mines(mid_r, mid_c)
+        return engine
+
+    yield "flood_reveal", flood_setup, lambda e: e.flood_reveal(mid_r, mid_c), False
+
+    @functools.cache
+    def chord_target():
+        return chord_cell(opened_engine(diff, seed))
+
+    def chord_setup():
+        target = chord_target()
+        if target is None:
+            raise SkipCase("no chord target on this board")
+        engine = opened_engine(diff, seed)
+        for ni in engine._neighbor_indices(target):
+            if engine._is_mine_index(ni):
+                engine.set_flag(*divmod(ni, engine.cols))
+        return engine, target
+
+    yield "chord", chord_setup, lambda state: state[0].chord(*divmod(state[1], state[0].cols)), False
+
+    yield "check_win", lambda: opened_engine(diff, seed), lambda e: e._check_win(), True
+
+    lobby = functools.cache(lambda: played_lobby(diff, seed))
+    yield "lobby_to_dict", lobby, lambda lb: lb.to_dict(), True
+
+    snapshot = functools.cache(lambda: lobby().snapshot_message())
+    for codec in (JSON, BINARY):
+        yield f"encode_snapshot_{codec}", snapshot, lambda m, codec=codec: encode_msg(m, codec), True
+        yield (f"decode_snapshot_{codec}", lambda codec=codec: memoryview(encode_msg(snapshot(), codec))[4:],
+               decode_msg, True)
+
+
+def measure(setup, fn, pure: bool, min_time: float, max_time: float, min_rounds: int, max_rounds: int) -> dict:
+    """Per-call statistics; max_time bounds the wall time including per-round setup."""
+    timer = time.perf_counter
+    began = timer()
+    iterations = 1
+    state = setup() if pure else None
+    if pure:
+        # Calibrate so one round lasts at least a millisecond, as the timer
+        # overhead would dominate sub-microsecond calls otherwise.
+        while True:
+            start = timer()
+            for _ in range(iterations):
+                fn(state)
+            if timer() - start >= 1e-3 or iterations >= 1 << 20:
+                break
+            iterations *= 2
+
+    samples = []
+    total = 0.0
+    while len(samples) < min_rounds or (len(samples) < max_rounds and total < min_time and timer() - began < max_time):
+        if not pure:
+            state = setup()
+        start = timer()
+        for _ in range(iterations):
+            fn(state)
+        elapsed = timer() - start
+        total += elapsed
+        samples.append(elapsed / iterations)
+
+    mean = statistics.fmean(samples)
+    return {
+        "min": min(samples),
+        "max": max(samples),
+        "mean": mean,
+        "stddev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "median": statistics.median(samples),
+        "rounds": len(samples),
+        "iterations": iterations,
+        "ops": 1 / mean if mean else 0.0,
+    }
+
+
+def commit_info() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"id": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def compare(results: list[dict], baseline_path: str):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {b["fullname"]: b["stats"] for b in json.load(f)["benchmarks"]}
+    print(f"\nmedian vs {baseline_path}:")
+    for bench in results:
+        old = baseline.get(bench["fullname"])
+        if old is None:
+            continue
+        ratio = bench["stats"]["median"] / old["median"] if old["median"] else float("inf")
+        print(f"  {bench['fullname']:<40} {ratio:>6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boards", default=DEFAULT_BOARDS, help="preset names or ROWSxCOLS, comma separated")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--min-time", type=float, default=0.25, help="seconds of timed work per benchmark")
+    parser.add_argument("--max-time", type=float, default=3.0, help="wall seconds per benchmark, setup included")
+    parser.add_argument("--min-rounds", type=int, default=5)
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="print median ratios against an earlier --json file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'board':>10} {'benchmark':<22} {'median':>11} {'min':>11} {'stddev':>11} {'rounds':>7}")
+    for spec in args.boards.split(","):
+        diff = parse_board(spec)
+        for name, setup, fn, pure in cases(diff, args.seed):
+            if args.filter not in name:
+                continue
+            try:
+                stats = measure(setup, fn, pure, args.min_time, args.max_time, args.min_rounds, args.max_rounds)
+            except SkipCase as e:
+                print(f"{spec:>10} {name:<22} skipped: {e}")
+                continue
+            results.append({
+                "group": spec,
+                "name": name,
+                "fullname": f"{spec}::{name}",
+                "params": {"rows": diff.rows, "cols": diff.cols, "mines": diff.mines, "seed": args.seed},
+                "stats": stats,
+            })
+            print(f"{spec:>10} {name:<22} {stats['median'] * 1e6:>9.1f}us {stats['min'] * 1e6:>9.1f}us "
+                  f"{stats['stddev'] * 1e6:>9.1f}us {stats['rounds']:>7}")
+
+    report = {
+        "machine_info": {
+            "node": platform.node(),
+            "machine": platform.machine(),
+            "python_implementation": platform.python_implementation(),
+            "python_version": platform.python_version(),
+        },
+        "commit_info": commit_info(),
+        "datetime": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "benchmarks": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
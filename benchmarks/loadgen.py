@@ -0,0 +1,351 @@
+"""Load generator: bot clients playing against a running multiplayer server.
+
+Creates lobbies over HTTP, joins them with many TCP bots from one asyncio
+loop and has every bot send random reveal/flag/chord/chat actions at a fixed
+Poisson rate. Reports action throughput, the latency from an action to the
+first state message showing its effect, and bytes on the wire per client.
+
+Every bot mirrors its board and keeps at most one board action in flight,
+aimed at a cell where it can have an effect (a reveal on a covered cell, a
+chord on a number with as many flags as it needs and a covered neighbour,
+nothing while stunned); its latency sample is taken when the target cell, or
+for a chord one of its neighbours, changes. Ticks that fall while an action
+is in flight send nothing. Actions without a visible effect within
+--action-timeout, e.g. because another player got there first, count as
+unresolved and are left out of the latencies. A cell changed by another
+player at the same moment can still resolve a sample early. Chat messages
+are matched by their text.
+
+Start a server first, then run from the repository root:
+
+    python main.py --server
+    python benchmarks/loadgen.py --lobbies 20 --clients 160 --rate 2 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import struct
+import sys
+import time
+import urllib.request
+from dataclasses import dataclass, field
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network import (  # noqa: E402
+    COMPRESSED_FLAG, CODECS, COMPRESSIONS, HTTP_PORT, JSON, TCP_PORT, FrameDecompressor, decode_msg, encode_msg,
+)
+
+STATE_EVENTS = ("state_update", "state_delta")
+# Board actions and the cells whose change shows they took effect.
+TARGETED = ("reveal", "flag", "chord")
+PICK_ATTEMPTS = 16
+
+
+@dataclass
+class BotStats:
+    actions: dict = field(default_factory=dict)
+    states: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    latencies: dict = field(default_factory=dict)
+    unresolved: int = 0
+    chat_latencies: list = field(default_factory=list)
+    error: str | None = None
+
+
+def create_lobbies(host: str, port: int, count: int, body: dict) -> list[dict]:
+    lobbies = []
+    for _ in range(count):
+        req = urllib.request.Request(f"http://{host}:{port}/api/lobbies", data=json.dumps(body).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            lobbies.append(json.loads(resp.read().decode("utf-8")))
+    return lobbies
+
+
+class Bot:
+    def __init__(self, index: int, lobby: dict, args, started: asyncio.Event):
+        self.index = index
+        self.lobby = lobby
+        self.args = args
+        self.started = started
+        self.rng = random.Random(args.seed + index)
+        self.stats = BotStats()
+        self.codec = JSON
+        self.player_id = None
+        self.game_over = False
+        self.joined = asyncio.Event()
+        self.stop_at = 0.0
+        # Board mirror: value + 2 for open cells (a shown mine is 1), 0 while
+        # covered, and the owner of every flag.
+        self.rows, self.cols = lobby["rows"], lobby["cols"]
+        self._open = bytearray(self.rows * self.cols)
+        self._flags: dict[int, str] = {}
+        self._stunned_until = 0.0
+        # (kind, watched cell indices, send time) of the action in flight.
+        self._pending: tuple[str, list, float] | None = None
+        self._chats: dict[str, float] = {}
+
+    async def run(self):
+        try:
+            reader, writer = await asyncio.open_connection(self.args.host, self.args.tcp_port)
+        except OSError as e:
+            self.stats.error = str(e)
+            self.joined.set()
+            return
+        self.writer = writer
+        receiving = asyncio.create_task(self._receive(reader))
+        try:
+            self._send({"action": "join", "lobby_id": self.lobby["lobby_id"], "nickname": f"bot{self.index}",
+                        "codecs": [self.args.codec], "compression": self.args.compression})
+            await self.joined.wait()
+            await self.started.wait()
+            await self._play()
+        except (ConnectionError, OSError) as e:
+            self.stats.error = str(e)
+        finally:
+            receiving.cancel()
+            writer.close()
+
+    def _send(self, msg: dict, action: str | None = None, watch: list | None = None):
+        frame = encode_msg(msg, self.codec)
+        self.writer.write(frame)
+        self.stats.bytes_sent += len(frame)
+        if action is not None:
+            self.stats.actions[action] = self.stats.actions.get(action, 0) + 1
+            if action != "chat":
+                self._pending = (action, watch or [], time.perf_counter())
+
+    async def _receive(self, reader: asyncio.StreamReader):
+        inflater = FrameDecompressor()
+        try:
+            while True:
+                header = await reader.readexactly(4)
+                msglen = struct.unpack(">I", header)[0]
+                payload = await reader.readexactly(msglen & ~COMPRESSED_FLAG)
+                self.stats.bytes_received += 4 + len(payload)
+                if msglen & COMPRESSED_FLAG:
+                    payload = inflater.decompress(payload)
+                    if payload is None:
+                        raise ConnectionError("corrupt compressed frame")
+                self._on_message(decode_msg(payload) or {})
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            if self.stats.error is None and not self.joined.is_set():
+                self.stats.error = str(e) or "connection closed"
+            self.joined.set()
+
+    def _on_message(self, msg: dict):
+        event = msg.get("event")
+        if event == "join_success":
+            self.codec = msg.get("codec") or JSON
+            self.player_id = msg.get("player_id")
+        elif event in STATE_EVENTS:
+            self.stats.states += 1
+            now = time.perf_counter()
+            state = msg["lobby"] if event == "state_update" else msg
+            pending = self._pending
+            before = [self._cell(i) for i in pending[1]] if pending else None
+            self._apply(state, event == "state_update", now)
+            if pending:
+                kind, watched, sent = pending
+                if now - sent >= self.args.action_timeout:
+                    self.stats.unresolved += 1
+                    self._pending = None
+                elif (not self.game_over if kind == "restart"
+                        else any(self._cell(i) != old for i, old in zip(watched, before))):
+                    self.stats.latencies.setdefault(kind, []).append(now - sent)
+                    self._pending = None
+            if self._chats:
+                for entry in state.get("chat", ()):
+                    sent = self._chats.pop(entry.get("text"), None)
+                    if sent is not None:
+                        self.stats.chat_latencies.append(now - sent)
+            self.joined.set()
+        elif "error" in msg:
+            self.stats.error = msg["error"]
+            self.joined.set()
+
+    def _cell(self, i: int) -> tuple:
+        return self._open[i], self._flags.get(i)
+
+    def _apply(self, state: dict, snapshot: bool, now: float):
+        cols = self.cols
+        if snapshot:
+            self._open = bytearray(self.rows * cols)
+            self._flags = {}
+        for r, c, v in state.get("revealed_cells" if snapshot else "cells", ()):
+            self._open[r * cols + c] = v + 2
+        for r, c, owner in state.get("flags", ()):
+            if owner is None:
+                self._flags.pop(r * cols + c, None)
+            else:
+                self._flags[r * cols + c] = owner
+        for player in state.get("players") or ():
+            if player["id"] == self.player_id:
+                self._stunned_until = now + player.get("stunned_seconds", 0.0)
+        self.game_over = state.get("game_over", self.game_over)
+
+    def _pick(self, kind: str) -> int | None:
+        """A random cell where the action can take effect, or None if none was found."""
+        for _ in range(PICK_ATTEMPTS):
+            i = self.rng.randrange(len(self._open))
+            value, owner = self._cell(i)
+            if kind == "reveal" and not value and owner is None:
+                return i
+            if kind == "flag" and not value and owner in (None, self.player_id):
+                return i
+            if kind == "chord" and value >= 3:
+                around = [self._cell(ni) for ni in self._neighbours(i)]
+                flags = sum(1 for _, o in around if o is not None)
+                if flags == value - 2 and any(not v and o is None for v, o in around):
+                    return i
+        return None
+
+    def _neighbours(self, i: int) -> list:
+        r, c = divmod(i, self.cols)
+        return [nr * self.cols + nc
+                for nr in range(max(0, r - 1), min(self.rows, r + 2))
+                for nc in range(max(0, c - 1), min(self.cols, c + 2))]
+
+    async def _play(self):
+        kinds, weights = zip(*self.args.mix.items())
+        while True:
+            await asyncio.sleep(self.rng.expovariate(self.args.rate))
+            now = time.perf_counter()
+            if now >= self.stop_at:
+                return
+            if self._pending is not None:
+                if now - self._pending[2] < self.args.action_timeout:
+                    continue
+                self.stats.unresolved += 1
+                self._pending = None
+            if self.game_over:
+                self._send({"action": "restart"}, "restart")
+            else:
+                kind = self.rng.choices(kinds, weights)[0]
+                if kind == "chat":
+                    text = f"bot{self.index} {self.rng.randrange(1 << 30)}"
+                    self._send({"action": "chat", "message": text}, kind)
+                    self._chats[text] = time.perf_counter()
+                elif now >= self._stunned_until:
+                    i = self._pick(kind)
+                    if i is None:
+                        continue
+                    watch = self._neighbours(i) if kind == "chord" else [i]
+                    self._send({"action": kind, "row": i // self.cols, "col": i % self.cols}, kind, watch)
+            await self.writer.drain()
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def report(bots: list[Bot], elapsed: float) -> dict:
+    stats = [b.stats for b in bots]
+    ok = [s for s in stats if s.error is None]
+    actions = {}
+    for s in stats:
+        for kind, n in s.actions.items():
+            actions[kind] = actions.get(kind, 0) + n
+    by_kind = {}
+    for s in stats:
+        for kind, samples in s.latencies.items():
+            by_kind.setdefault(kind, []).extend(samples)
+    latencies = sorted(lat for samples in by_kind.values() for lat in samples)
+    chat_latencies = sorted(lat for s in stats for lat in s.chat_latencies)
+    total_actions = sum(actions.values())
+    return {
+        "clients": len(stats),
+        "failed_clients": len(stats) - len(ok),
+        "errors": sorted({s.error for s in stats if s.error}),
+        "seconds": elapsed,
+        "actions": actions,
+        "actions_per_s": total_actions / elapsed if elapsed else 0.0,
+        "state_messages_per_s": sum(s.states for s in stats) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "max": latencies[-1] * 1000 if latencies else 0.0,
+            "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            "p50_by_action": {kind: percentile(sorted(samples), 0.50) * 1000 for kind, samples in sorted(by_kind.items())},
+        },
+        "unresolved_actions": sum(s.unresolved for s in stats),
+        "chat_latency_ms": {
+            "p50": percentile(chat_latencies, 0.50) * 1000,
+            "p99": percentile(chat_latencies, 0.99) * 1000,
+        },
+        "bytes_per_client": {
+            "sent": sum(s.bytes_sent for s in stats) / max(1, len(stats)),
+            "received": sum(s.bytes_received for s in stats) / max(1, len(stats)),
+            "received_per_s": sum(s.bytes_received for s in stats) / max(1, len(stats)) / elapsed if elapsed else 0.0,
+        },
+    }
+
+
+async def run(args) -> dict:
+    body = {"difficulty": args.difficulty}
+    if args.rows:
+        body = {"rows": args.rows, "cols": args.cols, "mines": args.mines}
+    lobbies = await asyncio.to_thread(create_lobbies, args.host, args.http_port, args.lobbies, body)
+
+    started = asyncio.Event()
+    bots = [Bot(i, lobbies[i % len(lobbies)], args, started) for i in range(args.clients)]
+    hosts, guests = bots[:len(lobbies)], bots[len(lobbies):]
+    # Hosts join first so that each of them can start its lobby.
+    tasks = [asyncio.create_task(bot.run()) for bot in hosts]
+    await asyncio.gather(*(bot.joined.wait() for bot in hosts))
+    tasks += [asyncio.create_task(bot.run()) for bot in guests]
+    await asyncio.gather(*(bot.joined.wait() for bot in guests))
+    for bot in hosts:
+        if bot.stats.error is None:
+            bot._send({"action": "start_game"})
+
+    # Only the play phase is reported; joining traffic is left out.
+    for bot in bots:
+        bot.stats = BotStats(error=bot.stats.error)
+    began = time.perf_counter()
+    for bot in bots:
+        bot.stop_at = began + args.duration
+    started.set()
+    await asyncio.gather(*tasks)
+    return report(bots, time.perf_counter() - began)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--http-port", type=int, default=HTTP_PORT)
+    parser.add_argument("--tcp-port", type=int, default=TCP_PORT)
+    parser.add_argument("--lobbies", type=int, default=10)
+    parser.add_argument("--clients", type=int, default=80)
+    parser.add_argument("--difficulty", default="Hard")
+    parser.add_argument("--rows", type=int, help="custom board size instead of --difficulty")
+    parser.add_argument("--cols", type=int)
+    parser.add_argument("--mines", type=int)
+    parser.add_argument("--rate", type=float, default=2.0, help="actions per second per client")
+    parser.add_argument("--mix", default="reveal=4,flag=2,chord=1,chat=1", help="relative action weights")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of play after everyone joined")
+    parser.add_argument("--action-timeout", type=float, default=2.0,
+                        help="seconds before an action without a visible effect counts as unresolved")
+    parser.add_argument("--codec", choices=CODECS, default=JSON)
+    parser.add_argument("--compression", choices=COMPRESSIONS, action="append", default=[])
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+    args.mix = {k: float(v) for k, v in (item.split("=") for item in args.mix.split(","))}
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
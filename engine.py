@@ -1,6 +1,30 @@
 import json
 import random
+from array import array
 from dataclasses import dataclass
+from functools import lru_cache
+
+
+# Per-cell codes of Board.view_codes(): 0-8 is a revealed count.
+VIEW_MINE = 9
+VIEW_HIDDEN = 10
+VIEW_FLAG = 11  # == VIEW_HIDDEN | 1, so a 0/1 flag mask can be OR-ed in
+_REVEALED_MASK = bytes([0x00, 0xFF]) + bytes(254)
+_HIDDEN_CODE = bytes([VIEW_HIDDEN]) + bytes(255)
+_FLIP = bytes([1, 0]) + bytes(254)
+# _BIT_SHIFT[j] maps a 0/1 byte to bit j, for packing eight cells per byte.
+_BIT_SHIFT = [bytes((v << j) & 0xFF for v in range(256)) for j in range(8)]
+
+
+# Largest board a lobby accepts for custom sizes; coordinates travel as
+# 16-bit values in the binary codec, and a full snapshot grows with rows * cols.
+MAX_ROWS = 1000
+MAX_COLS = 1000
+# Local single-player boards never go over the network and are only bounded
+# by memory, about 60 bytes per cell.
+LOCAL_MAX_ROWS = 3000
+LOCAL_MAX_COLS = 3000
+CUSTOM = "Custom"
 
 
 @dataclass(frozen=True)
@@ -10,8 +34,147 @@ class Difficulty:
     cols: int
     mines: int
 
+    @classmethod
+    def custom(cls, rows: int, cols: int, mines: int, max_rows: int = MAX_ROWS, max_cols: int = MAX_COLS) -> "Difficulty":
+        """Validated custom board size; raises ValueError when it is out of bounds.
+
+        At least one cell stays free of mines so the first click is always safe.
+        """
+        if any(type(v) is not int for v in (rows, cols, mines)):
+            raise ValueError("rows, cols and mines must be integers")
+        if not (1 <= rows <= max_rows and 1 <= cols <= max_cols):
+            raise ValueError(f"board must be between 1x1 and {max_rows}x{max_cols}")
+        if not 1 <= mines < rows * cols:
+            raise ValueError(f"mines must be between 1 and {rows * cols - 1}")
+        return cls(f"{CUSTOM} {rows}x{cols}/{mines}", rows, cols, mines)
+
+    @property
+    def is_custom(self) -> bool:
+        return self.name.startswith(CUSTOM)
+
+
+class NeighborOffsets:
+    """Flat-index offsets of the in-bounds neighbours of every cell of a board shape.
+
+    Cell ``i`` has neighbours ``i + d for d in table[i]``. There are only nine
+    distinct offset tuples (corners, edges, interior); a lookup picks one from
+    the cell's row and column, so the table takes no memory per cell.
+    """
+
+    def __init__(self, rows: int, cols: int):
+        self.rows = rows
+        self.cols = cols
+        self._last_row = (rows - 1) * cols
+        # Keyed by (top, bottom, left, right) edge bits.
+        self._tables = [self._offsets(k & 8, k & 4, k & 2, k & 1) for k in range(16)]
+
+    def _offsets(self, top: int, bottom: int, left: int, right: int) -> tuple[int, ...]:
+        return tuple(
+            dr * self.cols + dc
+            for dr in (-1, 0, 1)
+            for dc in (-1, 0, 1)
+            if (dr or dc)
+            and not (dr == -1 and top) and not (dr == 1 and bottom)
+            and not (dc == -1 and left) and not (dc == 1 and right)
+        )
+
+    def __len__(self) -> int:
+        return self.rows * self.cols
+
+    def __getitem__(self, i: int) -> tuple[int, ...]:
+        c = i % self.cols
+        return self._tables[(i < self.cols) << 3 | (i >= self._last_row) << 2
+                            | (c == 0) << 1 | (c == self.cols - 1)]
+
+
+@lru_cache(maxsize=8)
+def neighbor_deltas(rows: int, cols: int) -> NeighborOffsets:
+    """The shared NeighborOffsets of a board shape."""
+    return NeighborOffsets(rows, cols)
+
+
+def random_mask(size: int, count: int, excluded) -> bytearray:
+    """0/1 mask with exactly ``count`` ones spread uniformly over the cells not in ``excluded``.
+
+    Every allowed cell is first drawn with probability count / allowed from one
+    random byte each, all in C; the few hundred cells the binomial draw is off
+    by are then added or removed one at a time. Both steps treat all allowed
+    cells alike, so every placement is equally likely. The draw is made for
+    the sparser of ones and zeros, which keeps the correction's rejections
+    below one in two.
+    """
+    allowed = size - len(excluded)
+    invert = count > allowed // 2
+    want = allowed - count if invert else count
+    threshold = round(256 * want / allowed) if allowed else 0
+    below = bytes(1 if v < threshold else 0 for v in range(256))
+    mask = bytearray(random.randbytes(size).translate(below))
+    for i in excluded:
+        mask[i] = 0
+    placed = mask.count(1)
+    while placed > want:
+        i = random.randrange(size)
+        if mask[i]:
+            mask[i] = 0
+            placed -= 1
+    while placed < want:
+        i = random.randrange(size)
+        if not mask[i] and i not in excluded:
+            mask[i] = 1
+            placed += 1
+    if invert:
+        mask = bytearray(mask.translate(_FLIP))
+        for i in excluded:
+            mask[i] = 0
+    return mask
+
+
+def pack_bits(mask: bytes) -> bytearray:
+    """Packs a 0/1 byte mask into a little-endian bitmask, bit ``i & 7`` of byte ``i >> 3``."""
+    packed = 0
+    for j in range(8):
+        packed |= int.from_bytes(mask[j::8].translate(_BIT_SHIFT[j]), "little")
+    return bytearray(packed.to_bytes((len(mask) + 7) // 8, "little"))
+
+
+@lru_cache(maxsize=4)
+def _column_masks(rows: int, cols: int) -> tuple[int, int]:
+    """Byte-lane masks that drop cells in the first / last column of each row."""
+    row = b"\x00" + b"\xff" * (cols - 1)
+    not_first = int.from_bytes(row * rows, "little")
+    not_last = int.from_bytes(row[::-1] * rows, "little")
+    return not_first, not_last
+
+
+def count_adjacent(mine_mask: bytes, rows: int, cols: int) -> bytearray:
+    """Counts the mines around every cell of a row-major 0/1 mine mask.
+
+    Each cell is one byte lane of a big integer, so the eight neighbour
+    contributions are a handful of whole-board shifts and additions that run
+    in C. A lane never exceeds 8, so lanes cannot carry into each other.
+    """
+    size = rows * cols
+    not_first, not_last = _column_masks(rows, cols)
+    mines = int.from_bytes(mine_mask, "little")
+
+    horizontal = ((mines << 8) & not_first) + ((mines >> 8) & not_last)
+    row_sum = mines + horizontal
+    row_bits = 8 * cols
+    total = horizontal + (row_sum << row_bits) + (row_sum >> row_bits)
+    total &= (1 << (8 * size)) - 1
+    return bytearray(total.to_bytes(size, "little"))
+
+
+class Board:
+    """Rule-free minefield shared by the single-player engine and server lobbies.
+
+    Cell ``(r, c)`` lives at index ``r * cols + c``. ``_adj``, ``_revealed`` and
+    ``_flags`` hold one byte per cell and mines are kept as a packed bitmask,
+    so a board costs a few bytes per cell. What a mine hit or a flag is worth
+    is left to the caller: ``MinesweeperEngine`` ends the game, ``server.Lobby``
+    scores it through its rules object.
+    """
 
-class MinesweeperEngine:
     def __init__(self, rows: int, cols: int, mines: int):
         self.rows = rows
         self.cols = cols
@@ -23,62 +186,255 @@ class MinesweeperEngine:
         self.game_over = False
         self.won = False
 
-        self.mines = set()
-        self.adj = [[0 for _ in range(self.cols)] for _ in range(self.rows)]
-        self.revealed = [[False for _ in range(self.cols)] for _ in range(self.rows)]
-        self.flags = set()
+        size = self.rows * self.cols
+        self._deltas = neighbor_deltas(self.rows, self.cols)
+        self._mine_bits = bytearray((size + 7) // 8)
+        self._adj = bytearray(size)
+        self._revealed = bytearray(size)
+        self._flags = bytearray(size)
+        self.flag_owners: dict[int, str] = {}
+        self.flag_count = 0
+        self.revealed_count = 0
+        self.safe_total = size - self.mines_total
+
+    @property
+    def safe_remaining(self) -> int:
+        return self.safe_total - self.revealed_count
 
     def in_bounds(self, r: int, c: int) -> bool:
         return 0 <= r < self.rows and 0 <= c < self.cols
 
     def neighbors(self, r: int, c: int):
-        for dr in (-1, 0, 1):
-            for dc in (-1, 0, 1):
-                if dr == 0 and dc == 0:
-                    continue
-                nr, nc = r + dr, c + dc
-                if self.in_bounds(nr, nc):
-                    yield nr, nc
+        i = r * self.cols + c
+        for d in self._deltas[i]:
+            yield divmod(i + d, self.cols)
+
+    def _neighbor_indices(self, i: int):
+        return [i + d for d in self._deltas[i]]
+
+    def _is_mine_index(self, i: int) -> bool:
+        return (self._mine_bits[i >> 3] >> (i & 7)) & 1 == 1
+
+    def is_mine(self, r: int, c: int) -> bool:
+        return self._is_mine_index(r * self.cols + c)
+
+    def is_revealed(self, r: int, c: int) -> bool:
+        return self._revealed[r * self.cols + c] == 1
+
+    def is_flagged(self, r: int, c: int) -> bool:
+        return self._flags[r * self.cols + c] == 1
+
+    def flag_owner(self, r: int, c: int) -> str | None:
+        return self.flag_owners.get(r * self.cols + c)
+
+    def value(self, r: int, c: int) -> int:
+        """Returns the adjacent mine count of a cell, or -1 for a mine."""
+        i = r * self.cols + c
+        if self._is_mine_index(i):
+            return -1
+        return self._adj[i]
+
+    def mine_cells(self):
+        bits = self._mine_bits
+        cols = self.cols
+        for byte_index, byte in enumerate(bits):
+            while byte:
+                low = byte & -byte
+                i = (byte_index << 3) + low.bit_length() - 1
+                yield divmod(i, cols)
+                byte ^= low
+
+    def revealed_cells(self):
+        """Yields ``(r, c, value)`` for every revealed cell, mines included."""
+        cols = self.cols
+        revealed = self._revealed
+        i = revealed.find(1)
+        while i != -1:
+            r, c = divmod(i, cols)
+            yield r, c, self.value(r, c)
+            i = revealed.find(1, i + 1)
+
+    def flagged_cells(self):
+        """Yields ``(r, c, owner)`` for every flag; owner is None without one."""
+        cols = self.cols
+        flags = self._flags
+        i = flags.find(1)
+        while i != -1:
+            yield i // cols, i % cols, self.flag_owners.get(i)
+            i = flags.find(1, i + 1)
+
+    def view_codes(self, show_mines: bool = False) -> bytearray:
+        """One VIEW_* code per cell, for drawing a whole-board overview.
+
+        Combined as byte lanes of big integers, like count_adjacent, so even a
+        multi-million cell board is encoded without a Python loop per cell.
+        """
+        size = self.rows * self.cols
+        revealed = bytes(self._revealed)
+        codes = ((int.from_bytes(self._adj, "big") & int.from_bytes(revealed.translate(_REVEALED_MASK), "big"))
+                 | int.from_bytes(revealed.translate(_HIDDEN_CODE), "big")
+                 | int.from_bytes(self._flags, "big"))
+        codes = bytearray(codes.to_bytes(size, "big"))
+        for r, c in (self.mine_cells() if show_mines else ()):
+            codes[r * self.cols + c] = VIEW_MINE
+        return codes
+
+    def ensure_mines(self, safe_r: int, safe_c: int) -> bool:
+        """Places the mines around the first click; returns True if it did."""
+        if not self.first_click:
+            return False
+        self._place_mines(safe_r, safe_c)
+        self.first_click = False
+        return True
 
     def _place_mines(self, safe_r: int, safe_c: int):
-        forbidden = {(safe_r, safe_c)} | set(self.neighbors(safe_r, safe_c))
-        candidates = [(r, c) for r in range(self.rows) for c in range(self.cols) if (r, c) not in forbidden]
-        if len(candidates) < self.mines_total:
-            forbidden = {(safe_r, safe_c)}
-            candidates = [(r, c) for r in range(self.rows) for c in range(self.cols) if (r, c) not in forbidden]
-        self.mines = set(random.sample(candidates, self.mines_total))
-
-        for r in range(self.rows):
-            for c in range(self.cols):
-                if (r, c) in self.mines:
-                    self.adj[r][c] = -1
-                else:
-                    self.adj[r][c] = sum((nr, nc) in self.mines for nr, nc in self.neighbors(r, c))
+        size = self.rows * self.cols
+        safe = safe_r * self.cols + safe_c
+        forbidden = {safe, *self._neighbor_indices(safe)}
+        if size - len(forbidden) < self.mines_total:
+            forbidden = {safe}
+        mask = random_mask(size, self.mines_total, forbidden)
+        self._mine_bits = pack_bits(mask)
+        self._adj = count_adjacent(mask, self.rows, self.cols)
+
+    def set_flag(self, r: int, c: int, owner: str | None = None):
+        i = r * self.cols + c
+        if self._flags[i]:
+            return
+        self._flags[i] = 1
+        self.flag_count += 1
+        if owner is not None:
+            self.flag_owners[i] = owner
+
+    def clear_flag(self, r: int, c: int):
+        i = r * self.cols + c
+        if not self._flags[i]:
+            return
+        self._flags[i] = 0
+        self.flag_count -= 1
+        self.flag_owners.pop(i, None)
+
+    def reveal_mine(self, r: int, c: int):
+        """Uncovers a mine without counting it toward the safe cells."""
+        self._revealed[r * self.cols + c] = 1
+
+    def chord_targets(self, r: int, c: int) -> list[tuple[int, int]]:
+        """Returns the covered, unflagged neighbours a chord on (r, c) opens.
+
+        The list is empty unless (r, c) is a revealed number whose flag count
+        matches it.
+        """
+        i = r * self.cols + c
+        if not self._revealed[i] or self._is_mine_index(i):
+            return []
+        n = self._adj[i]
+        if n <= 0:
+            return []
+        around = self._neighbor_indices(i)
+        if sum(self._flags[ni] for ni in around) != n:
+            return []
+        cols = self.cols
+        return [divmod(ni, cols) for ni in around if not self._flags[ni] and not self._revealed[ni]]
+
+    def flood_reveal(self, r: int, c: int) -> array:
+        """Opens (r, c) and, if it is a zero, the whole region it borders.
+
+        Zero cells are filled a row span at a time: the span is widened left
+        and right, marked in one slice assignment, and only the first cell of
+        each zero run above and below it is queued as a new seed. Returns the
+        flat indices (``r * cols + c``) of the newly revealed cells.
+        """
+        opened = array("i")
+        cols = self.cols
+        size = self.rows * cols
+        adj = self._adj
+        revealed = self._revealed
+        flags = self._flags
+
+        start = r * cols + c
+        if revealed[start] or flags[start] or self._is_mine_index(start):
+            return opened
+        if adj[start]:
+            revealed[start] = 1
+            opened.append(start)
+            self.revealed_count += 1
+            return opened
+
+        # Every neighbour of a zero cell is safe, so nothing below needs a
+        # mine test.
+        seeds = [start]
+        while seeds:
+            i = seeds.pop()
+            if revealed[i] or flags[i]:
+                continue
+            row_start = i - i % cols
+            row_end = row_start + cols
+            a = i
+            while a > row_start and not adj[a - 1] and not revealed[a - 1] and not flags[a - 1]:
+                a -= 1
+            b = i + 1
+            while b < row_end and not adj[b] and not revealed[b] and not flags[b]:
+                b += 1
+            revealed[a:b] = b"\x01" * (b - a)
+            opened.extend(range(a, b))
+
+            lo = a - 1 if a > row_start else a
+            hi = b + 1 if b < row_end else b
+            for j in (lo, hi - 1):
+                if not revealed[j] and not flags[j]:
+                    revealed[j] = 1
+                    opened.append(j)
+
+            for base in (lo - cols, lo + cols):
+                if base < 0 or base >= size:
+                    continue
+                in_run = False
+                for j in range(base, base + hi - lo):
+                    if revealed[j] or flags[j]:
+                        in_run = False
+                    elif adj[j]:
+                        revealed[j] = 1
+                        opened.append(j)
+                        in_run = False
+                    elif not in_run:
+                        seeds.append(j)
+                        in_run = True
+
+        self.revealed_count += len(opened)
+        return opened
+
+
+class MinesweeperEngine(Board):
+    """Classic single-player rules: the first mine ends the game."""
 
     def toggle_flag(self, r: int, c: int):
-        if self.game_over or self.revealed[r][c]:
+        if self.game_over or self.is_revealed(r, c):
             return
-        if (r, c) in self.flags:
-            self.flags.remove((r, c))
+        if self.is_flagged(r, c):
+            self.clear_flag(r, c)
         else:
-            self.flags.add((r, c))
+            self.set_flag(r, c)
+
+    def flag_all_mines(self):
+        for r, c, _ in list(self.flagged_cells()):
+            self.clear_flag(r, c)
+        for r, c in self.mine_cells():
+            self.set_flag(r, c)
 
     def reveal(self, r: int, c: int):
         if self.game_over:
             return {"type": "noop"}
-        if (r, c) in self.flags or self.revealed[r][c]:
+        if self.is_flagged(r, c) or self.is_revealed(r, c):
             return {"type": "noop"}
 
-        if self.first_click:
-            self._place_mines(r, c)
-            self.first_click = False
+        self.ensure_mines(r, c)
 
-        if (r, c) in self.mines:
+        if self.is_mine(r, c):
             self.game_over = True
             self.won = False
             return {"type": "boom", "trigger": (r, c)}
 
-        revealed = self._flood_reveal(r, c)
+        revealed = self.flood_reveal(r, c)
         if self._check_win():
             return {"type": "win", "revealed": revealed}
         return {"type": "reveal", "revealed": revealed}
@@ -86,52 +442,26 @@ class MinesweeperEngine:
     def chord(self, r: int, c: int):
         if self.game_over or self.first_click:
             return {"type": "noop"}
-        if not self.revealed[r][c]:
-            return {"type": "noop"}
-        n = self.adj[r][c]
-        if n <= 0:
-            return {"type": "noop"}
-
-        flagged_around = sum((nr, nc) in self.flags for nr, nc in self.neighbors(r, c))
-        if flagged_around != n:
+        targets = self.chord_targets(r, c)
+        if not targets:
             return {"type": "noop"}
 
-        revealed_total = set()
-        for nr, nc in self.neighbors(r, c):
-            if (nr, nc) in self.flags or self.revealed[nr][nc]:
-                continue
-            if (nr, nc) in self.mines:
+        revealed_total = array("i")
+        for nr, nc in targets:
+            if self.is_mine(nr, nc):
                 self.game_over = True
                 self.won = False
                 return {"type": "boom", "trigger": (nr, nc)}
-            revealed_total |= self._flood_reveal(nr, nc)
+            revealed_total.extend(self.flood_reveal(nr, nc))
 
         if self._check_win():
             return {"type": "win", "revealed": revealed_total}
         return {"type": "reveal", "revealed": revealed_total}
 
-    def _flood_reveal(self, r: int, c: int):
-        revealed = set()
-        stack = [(r, c)]
-        while stack:
-            cr, cc = stack.pop()
-            if self.revealed[cr][cc] or (cr, cc) in self.flags:
-                continue
-            if (cr, cc) in self.mines:
-                continue
-            self.revealed[cr][cc] = True
-            revealed.add((cr, cc))
-            if self.adj[cr][cc] == 0:
-                for nr, nc in self.neighbors(cr, cc):
-                    if not self.revealed[nr][nc] and (nr, nc) not in self.mines:
-                        stack.append((nr, nc))
-        return revealed
-
     def _check_win(self) -> bool:
         if self.game_over:
             return self.won
-        revealed_count = sum(1 for r in range(self.rows) for c in range(self.cols) if self.revealed[r][c])
-        if revealed_count == self.rows * self.cols - self.mines_total:
+        if self.revealed_count == self.safe_total:
             self.game_over = True
             self.won = True
             return True
@@ -1,7 +1,19 @@
 import sys
+from engine import LOCAL_MAX_COLS, LOCAL_MAX_ROWS, Difficulty
 from ui import run
 from server import start_all_servers
 
+
+def parse_custom(spec: str) -> Difficulty:
+    """Parses ROWSxCOLS/MINES, e.g. 200x200/6000."""
+    try:
+        size, mines = spec.lower().split("/")
+        rows, cols = size.split("x")
+        return Difficulty.custom(int(rows), int(cols), int(mines), LOCAL_MAX_ROWS, LOCAL_MAX_COLS)
+    except ValueError as e:
+        sys.exit(f"Invalid --custom '{spec}': {e}")
+
+
 if __name__ == "__main__":
     if "--server" in sys.argv:
         name = "Minesweeper LAN Server"
@@ -12,10 +24,16 @@ if __name__ == "__main__":
         except ValueError:
             pass
         
-        print(f"Starting Minesweeper server: '{name}'")
+        use_asyncio = "--asyncio" in sys.argv
+        mode = "asyncio" if use_asyncio else "threaded"
+        print(f"Starting Minesweeper server: '{name}' ({mode})")
         try:
-            start_all_servers(name)
+            start_all_servers(name, use_asyncio=use_asyncio)
         except KeyboardInterrupt:
             print("\nServer shut down.")
     else:
-        run()
+        custom = None
+        if "--custom" in sys.argv:
+            idx = sys.argv.index("--custom")
+            custom = parse_custom(sys.argv[idx + 1] if idx + 1 < len(sys.argv) else "")
+        run(custom, debug="--debug" in sys.argv)
@@ -1,6 +1,11 @@
 import struct
 import json
 import socket
+import threading
+import zlib
+import http.client
+
+from engine import MAX_ROWS, MAX_COLS
 
 UDP_PORT = 50000
 HTTP_PORT = 50001
@@ -9,38 +14,420 @@ TCP_PORT = 50002
 DISCOVER_MSG = b"MINESWEEPER_DISCOVER"
 OFFER_PREFIX = "MINESWEEPER_OFFER"
 
-def recv_exact(sock: socket.socket, n: int) -> bytes | None:
+# Payload encodings. A client lists the ones it understands in "join" and the
+# server answers with its pick in "join_success"; JSON is always understood.
+# Binary payloads start with an opcode byte, JSON ones with "{", so frames can
+# be decoded without knowing which codec was negotiated.
+JSON = "json"
+BINARY = "binary"
+CODECS = (BINARY, JSON)
+
+OP_REVEAL = 0x01
+OP_FLAG = 0x02
+OP_CHORD = 0x03
+OP_STATE_DELTA = 0x10
+OP_STATE_UPDATE = 0x11
+OP_STATE_UPDATE_RUNS = 0x12
+
+# Per-connection compression, also offered in "join". Frames whose payload is
+# at least COMPRESS_THRESHOLD bytes go out deflated through one streaming
+# compressor per connection, marked by the high bit of the length prefix.
+DEFLATE = "deflate"
+COMPRESSIONS = (DEFLATE,)
+COMPRESS_THRESHOLD = 512
+COMPRESSED_FLAG = 0x80000000
+
+# Largest payload a client accepts from the server. The biggest legal frame
+# is a JSON snapshot of a MAX_ROWS x MAX_COLS board listing every cell, at most
+# about 24 bytes each (a flag with its owner, '[999, 999, "1a2b3c"], '), plus
+# players and chat. A length prefix above the limit is a broken or hostile
+# peer, and the connection is dropped before anything is allocated for it.
+MAX_FRAME = 32 * MAX_ROWS * MAX_COLS
+# Clients only ever send actions, joins and chat lines, so the server holds
+# them to a much smaller limit.
+MAX_CLIENT_FRAME = 64 * 1024
+
+_ACTION_OPS = {"reveal": OP_REVEAL, "flag": OP_FLAG, "chord": OP_CHORD}
+_OP_ACTIONS = {op: action for action, op in _ACTION_OPS.items()}
+_ACTION = struct.Struct(">BHH")
+_RUN = struct.Struct(">IIH")
+
+# Cell nibbles: 0-8 revealed count, 9 mine, 15 hidden.
+_NIBBLE_MINE = 9
+_NIBBLE_HIDDEN = 15
+_SHIFT_HIGH = bytes((i << 4) & 0xFF for i in range(256))
+_HIGH = bytes(i >> 4 for i in range(256))
+_LOW = bytes(i & 0x0F for i in range(256))
+
+def recv_exact(sock: socket.socket, n: int) -> bytearray | None:
     """Helper function to recv exactly n bytes or return None if EOF is reached."""
-    data = b""
-    while len(data) < n:
+    data = bytearray(n)
+    view = memoryview(data)
+    received = 0
+    while received < n:
         try:
-            packet = sock.recv(n - len(data))
-            if not packet:
+            count = sock.recv_into(view[received:])
+            if not count:
                 return None
-            data += packet
+            received += count
         except (socket.error, ConnectionResetError):
             return None
     return data
 
+class FrameReader:
+    """Reads length-prefixed frames from a socket through one reusable buffer.
+
+    Data is received straight into a preallocated bytearray with recv_into, so
+    a frame arriving in many small chunks is never concatenated, and several
+    frames delivered by a single recv are handed out one by one without
+    touching the socket again. The buffer only grows for a frame larger than
+    itself, and never past max_frame: a longer frame reads as EOF.
+
+    Compressed frames are only inflated once an inflater is set, which the
+    owner does when the connection negotiated compression; until then, and
+    for frames that fail to inflate, reading stops as on EOF.
+    """
+
+    def __init__(self, sock: socket.socket, size: int = 64 * 1024, inflater: "FrameDecompressor | None" = None,
+                 max_frame: int = MAX_FRAME):
+        self.sock = sock
+        self.max_frame = max_frame
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+        self.inflater = inflater
+        self.bytes_read = 0
+
+    def read_frame(self) -> memoryview | None:
+        """Returns the next payload, valid until the following call, or None on EOF."""
+        while True:
+            available = self._end - self._start
+            needed = 4
+            if available >= 4:
+                header = struct.unpack_from(">I", self._buf, self._start)[0]
+                if header & ~COMPRESSED_FLAG > self.max_frame:
+                    return None
+                needed += header & ~COMPRESSED_FLAG
+                if available >= needed:
+                    payload = self._view[self._start + 4:self._start + needed]
+                    self._start += needed
+                    if header & COMPRESSED_FLAG:
+                        data = self.inflater.decompress(payload) if self.inflater else None
+                        return None if data is None else memoryview(data)
+                    return payload
+            if self._start + needed > len(self._buf):
+                self._make_room(needed)
+            try:
+                count = self.sock.recv_into(self._view[self._end:])
+            except (socket.error, ConnectionResetError):
+                return None
+            if not count:
+                return None
+            self._end += count
+            self.bytes_read += count
+
+    def read_msg(self) -> dict | None:
+        payload = self.read_frame()
+        if payload is None:
+            return None
+        return decode_msg(payload)
+
+    def _make_room(self, needed: int):
+        available = self._end - self._start
+        if needed > len(self._buf):
+            buf = bytearray(max(needed, 2 * len(self._buf)))
+            buf[:available] = self._view[self._start:self._end]
+            self._buf = buf
+            self._view = memoryview(buf)
+        else:
+            self._view[:available] = self._view[self._start:self._end]
+        self._start = 0
+        self._end = available
+
 def recv_msg(sock: socket.socket) -> dict | None:
     """Receives a length-prefixed JSON message from the TCP socket."""
     raw_msglen = recv_exact(sock, 4)
     if not raw_msglen:
         return None
     msglen = struct.unpack(">I", raw_msglen)[0]
+    if msglen > MAX_FRAME:
+        return None
     data = recv_exact(sock, msglen)
     if not data:
         return None
-    try:
-        return json.loads(data.decode("utf-8"))
-    except json.JSONDecodeError:
+    return decode_msg(data)
+
+def negotiate_codec(offered) -> str:
+    """Picks the first codec from a client's preference list that we support."""
+    for codec in offered or ():
+        if codec in CODECS:
+            return codec
+    return JSON
+
+def negotiate_compression(offered) -> str | None:
+    """Picks the first compression from a client's preference list, or None."""
+    for compression in offered or ():
+        if compression in COMPRESSIONS:
+            return compression
+    return None
+
+class FrameCompressor:
+    """Deflates large outgoing frames of one connection with a shared history.
+
+    The zlib stream spans the whole connection, so repeated keys, player
+    entries and board runs compress against earlier frames. Every frame ends
+    with a sync flush so the peer can decode it on arrival. Frames must pass
+    through compress() in the order they are sent.
+    """
+
+    def __init__(self, threshold: int = COMPRESS_THRESHOLD, level: int = 6):
+        self.threshold = threshold
+        self._deflater = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    def compress(self, frame: bytes) -> bytes:
+        if len(frame) - 4 < self.threshold:
+            return frame
+        payload = memoryview(frame)[4:]
+        data = self._deflater.compress(payload) + self._deflater.flush(zlib.Z_SYNC_FLUSH)
+        return struct.pack(">I", len(data) | COMPRESSED_FLAG) + data
+
+class FrameDecompressor:
+    """Inflates frames produced by the peer's FrameCompressor, in order.
+
+    Returns None for corrupt data and for a frame inflating past max_frame;
+    the stream cannot be resumed after either, so the connection must end.
+    """
+
+    def __init__(self, max_frame: int = MAX_FRAME):
+        self.max_frame = max_frame
+        self._inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+
+    def decompress(self, payload: bytes | memoryview) -> bytes | None:
+        try:
+            data = self._inflater.decompress(payload, self.max_frame)
+        except zlib.error:
+            return None
+        if self._inflater.unconsumed_tail:
+            return None
+        return data
+
+def _pack_nibbles(values: bytes) -> bytes:
+    """Packs byte values below 16 two per byte, high nibble first."""
+    if len(values) % 2:
+        values = bytes(values) + b"\x00"
+    high = bytes(values[0::2]).translate(_SHIFT_HIGH)
+    low = bytes(values[1::2])
+    return (int.from_bytes(high, "big") | int.from_bytes(low, "big")).to_bytes(len(low), "big")
+
+def _unpack_nibbles(packed: bytes, count: int) -> bytearray:
+    packed = bytes(packed)
+    values = bytearray(2 * len(packed))
+    values[0::2] = packed.translate(_HIGH)
+    values[1::2] = packed.translate(_LOW)
+    del values[count:]
+    return values
+
+def _cell_nibble(value: int) -> int:
+    return value if value >= 0 else _NIBBLE_MINE
+
+def _nibble_value(nibble: int) -> int:
+    return -1 if nibble == _NIBBLE_MINE else nibble
+
+def _json_bytes(data) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+def _encode_runs(cells) -> bytes:
+    """Encodes [row, col, value] cells as (row, col, length) runs plus packed values.
+
+    Cells opened by one action are mostly row spans, which keeps this far
+    smaller than listing every coordinate.
+    """
+    runs = bytearray()
+    values = bytearray()
+    run_count = 0
+    run_r = run_c = run_len = -1
+    for r, c, v in sorted(cells):
+        if r == run_r and c == run_c + run_len and run_len < 0xFFFF:
+            run_len += 1
+        else:
+            if run_len > 0:
+                runs += _RUN.pack(run_r, run_c, run_len)
+                run_count += 1
+            run_r, run_c, run_len = r, c, 1
+        values.append(_cell_nibble(v))
+    if run_len > 0:
+        runs += _RUN.pack(run_r, run_c, run_len)
+        run_count += 1
+    return struct.pack(">II", run_count, len(values)) + runs + _pack_nibbles(values)
+
+def _decode_runs(payload: memoryview, offset: int) -> tuple[list, int]:
+    """Inverse of _encode_runs; returns the cells and the offset past them."""
+    run_count, value_count = struct.unpack_from(">II", payload, offset)
+    offset += 8
+    runs = [_RUN.unpack_from(payload, offset + k * _RUN.size) for k in range(run_count)]
+    offset += run_count * _RUN.size
+    packed_len = (value_count + 1) // 2
+    values = _unpack_nibbles(payload[offset:offset + packed_len], value_count)
+    cells = []
+    k = 0
+    for r, c, length in runs:
+        for dc in range(length):
+            cells.append([r, c + dc, _nibble_value(values[k])])
+            k += 1
+    return cells, offset + packed_len
+
+def _encode_binary(data: dict) -> bytes | None:
+    """Binary payload for the hot message types, or None to fall back to JSON."""
+    op = _ACTION_OPS.get(data.get("action"))
+    if op is not None:
+        r, c = data.get("row"), data.get("col")
+        if isinstance(r, int) and isinstance(c, int) and 0 <= r <= 0xFFFF and 0 <= c <= 0xFFFF:
+            return _ACTION.pack(op, r, c)
         return None
 
-def send_msg(sock: socket.socket, data: dict) -> bool:
-    """Sends a length-prefixed JSON message over the TCP socket."""
+    event = data.get("event")
+    if event == "state_update":
+        lobby = data["lobby"]
+        rows, cols = lobby["rows"], lobby["cols"]
+        revealed = lobby["revealed_cells"]
+        tail = _json_bytes(dict(data, lobby={k: v for k, v in lobby.items() if k != "revealed_cells"}))
+        # Early in a game the revealed area is a few runs; later on a board
+        # packed at 4 bits per cell is smaller. Send whichever is.
+        dense_len = (rows * cols + 1) // 2 + 8
+        if len(revealed) < dense_len:
+            runs = _encode_runs(revealed)
+            if len(runs) < dense_len:
+                return bytes([OP_STATE_UPDATE_RUNS]) + runs + tail
+        cells = bytearray([_NIBBLE_HIDDEN]) * (rows * cols)
+        for r, c, v in revealed:
+            cells[r * cols + c] = _cell_nibble(v)
+        return struct.pack(">BII", OP_STATE_UPDATE, rows, cols) + _pack_nibbles(cells) + tail
+
+    if event == "state_delta":
+        tail = {k: v for k, v in data.items() if k != "cells"}
+        return bytes([OP_STATE_DELTA]) + _encode_runs(data["cells"]) + _json_bytes(tail)
+    return None
+
+def _decode_binary(payload: memoryview) -> dict | None:
+    op = payload[0]
+    if op in _OP_ACTIONS:
+        _, r, c = _ACTION.unpack_from(payload)
+        return {"action": _OP_ACTIONS[op], "row": r, "col": c}
+
+    if op == OP_STATE_UPDATE:
+        _, rows, cols = struct.unpack_from(">BII", payload)
+        offset = 9
+        packed_len = (rows * cols + 1) // 2
+        cells = _unpack_nibbles(payload[offset:offset + packed_len], rows * cols)
+        msg = json.loads(str(payload[offset + packed_len:], "utf-8"))
+        msg["lobby"]["revealed_cells"] = [[i // cols, i % cols, _nibble_value(v)]
+                                          for i, v in enumerate(cells) if v != _NIBBLE_HIDDEN]
+        return msg
+
+    if op == OP_STATE_UPDATE_RUNS:
+        cells, offset = _decode_runs(payload, 1)
+        msg = json.loads(str(payload[offset:], "utf-8"))
+        msg["lobby"]["revealed_cells"] = cells
+        return msg
+
+    if op == OP_STATE_DELTA:
+        cells, offset = _decode_runs(payload, 1)
+        msg = json.loads(str(payload[offset:], "utf-8"))
+        msg["cells"] = cells
+        return msg
+    return None
+
+def decode_msg(payload: bytes | memoryview) -> dict | None:
+    """Decodes the payload of one frame (without its length prefix), in either codec."""
+    if not payload:
+        return None
     try:
+        if payload[0] < 0x20:
+            return _decode_binary(memoryview(payload))
+        return json.loads(str(payload, "utf-8"))
+    except (json.JSONDecodeError, UnicodeDecodeError, struct.error, ValueError, KeyError):
+        return None
+
+def encode_msg(data: dict, codec: str = JSON) -> bytes:
+    """Serializes a message into a complete length-prefixed frame."""
+    serialized = _encode_binary(data) if codec == BINARY else None
+    if serialized is None:
         serialized = json.dumps(data).encode("utf-8")
-        sock.sendall(struct.pack(">I", len(serialized)) + serialized)
+    return struct.pack(">I", len(serialized)) + serialized
+
+class EncodedMessage:
+    """A message encoded at most once per codec, for fanning out to many clients."""
+
+    def __init__(self, data: dict):
+        self.data = data
+        self._frames: dict[str, bytes] = {}
+
+    def frame(self, codec: str = JSON) -> bytes:
+        frame = self._frames.get(codec)
+        if frame is None:
+            frame = self._frames[codec] = encode_msg(self.data, codec)
+        return frame
+
+def send_frame(sock: socket.socket, frame: bytes) -> bool:
+    """Sends an already encoded frame; lets one encoding be fanned out to many sockets."""
+    try:
+        sock.sendall(frame)
         return True
     except (socket.error, ConnectionResetError):
         return False
+
+def send_msg(sock: socket.socket, data: dict, codec: str = JSON) -> bool:
+    """Sends a length-prefixed message over the TCP socket."""
+    return send_frame(sock, encode_msg(data, codec))
+
+class ApiClient:
+    """JSON requests to one server's REST API over a kept-alive HTTP/1.1 connection.
+
+    Requests from several threads are serialized on the one connection. If a
+    reused connection turns out to have been closed by the server while idle,
+    it is reopened and the request sent again.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 1.5):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._conn: http.client.HTTPConnection | None = None
+        self._lock = threading.Lock()
+
+    def request(self, method: str, path: str, body=None, headers: dict | None = None):
+        """Returns (status, response headers, decoded JSON body or None)."""
+        data = None if body is None else json.dumps(body).encode("utf-8")
+        all_headers = {"Accept": "application/json", **(headers or {})}
+        if data is not None:
+            all_headers["Content-Type"] = "application/json"
+        with self._lock:
+            while True:
+                reused = self._conn is not None
+                if not reused:
+                    self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                try:
+                    self._conn.request(method, path, body=data, headers=all_headers)
+                    resp = self._conn.getresponse()
+                    raw = resp.read()
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    self._close_locked()
+                    if reused:
+                        continue
+                    raise
+                except Exception:
+                    self._close_locked()
+                    raise
+                if resp.will_close:
+                    self._close_locked()
+                return resp.status, resp.headers, json.loads(raw) if raw else None
+
+    def close(self):
+        with self._lock:
+            self._close_locked()
+
+    def _close_locked(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -1,15 +1,21 @@
+import math
+import os
 import socket
 import threading
+from collections import deque
 import json
 import uuid
 import time
 import urllib.parse
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from dataclasses import dataclass, asdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from array import array
+from dataclasses import dataclass, astuple
 import random
+from contextlib import contextmanager
 
-from network import UDP_PORT, HTTP_PORT, TCP_PORT, DISCOVER_MSG, OFFER_PREFIX, send_msg, recv_msg
-from engine import Difficulty, MinesweeperEngine, ScoreManager
+from network import UDP_PORT, HTTP_PORT, TCP_PORT, DISCOVER_MSG, OFFER_PREFIX, JSON, EncodedMessage, encode_msg, negotiate_codec, negotiate_compression, FrameCompressor, send_frame, FrameReader, FrameDecompressor, MAX_CLIENT_FRAME
+from engine import MAX_COLS, MAX_ROWS, Board, Difficulty, ScoreManager
+from metrics import REGISTRY, CONTENT_TYPE
 
 DIFFICULTIES = {
     "Easy": Difficulty("Easy", 9, 9, 10),
@@ -17,6 +23,26 @@ DIFFICULTIES = {
     "Hard": Difficulty("Hard", 16, 30, 99),
 }
 
+ACTIONS = ("join", "leave", "resync", "chat", "start_game", "reveal", "flag", "chord", "restart")
+
+CONNECTIONS = REGISTRY.counter("minesweeper_connections_total", "TCP connections accepted.")
+OPEN_CONNECTIONS = REGISTRY.gauge("minesweeper_connections_open", "TCP connections currently open.")
+LOBBY_COUNT = REGISTRY.gauge("minesweeper_lobbies", "Lobbies currently open.")
+ACTION_COUNT = REGISTRY.counter("minesweeper_actions_total", "Client messages handled, by action.", ("action",))
+BROADCASTS = REGISTRY.counter("minesweeper_broadcasts_total", "State broadcasts, by message kind.", ("kind",))
+BROADCAST_FRAMES = REGISTRY.counter("minesweeper_broadcast_frames_total", "Frames queued by state broadcasts.")
+BROADCAST_BYTES = REGISTRY.counter("minesweeper_broadcast_bytes_total",
+                                   "Bytes queued by state broadcasts, before compression.")
+BROADCAST_SECONDS = REGISTRY.histogram("minesweeper_broadcast_seconds",
+                                       "Time spent per state broadcast, by phase.", ("phase",))
+BYTES_SENT = REGISTRY.counter("minesweeper_bytes_sent_total", "Bytes written to TCP clients, after compression.")
+BYTES_RECEIVED = REGISTRY.counter("minesweeper_bytes_received_total", "Bytes read from TCP clients.")
+SEND_FAILURES = REGISTRY.counter("minesweeper_send_failures_total",
+                                 "Frames not delivered: socket errors and dropped backlogs.", ("reason",))
+LOCK_WAIT = REGISTRY.histogram("minesweeper_lobby_lock_wait_seconds", "Time spent waiting for a lobby lock.")
+LOBBY_SECONDS = REGISTRY.histogram("minesweeper_lobby_op_seconds", "Time spent in lobby operations.", ("op",))
+SEND_SECONDS = REGISTRY.histogram("minesweeper_send_seconds", "Time to write one frame to a client socket.")
+
 
 @dataclass
 class Player:
@@ -29,56 +55,189 @@ class Player:
     connected: bool
 
 
+class ClientWriter:
+    """Bounded outbound queue for one connection, drained by its own thread.
+
+    Game code only appends frames under a short lock, so a stalled client can
+    never block the lobby. A snapshot frame supersedes everything queued before
+    it. When the queue overflows the backlog is dropped and send() returns
+    False so the caller can queue a snapshot instead; overflowing again before
+    that snapshot started going out means the client is too far behind and it
+    is disconnected. Overflowing while a snapshot is being written only means
+    the client is still downloading it, so the backlog is replaced by another
+    snapshot to follow the current one.
+
+    Frames are queued as shared by the whole lobby and only compressed here,
+    on the way out, when the connection negotiated compression.
+    """
+    MAX_PENDING = 64
+
+    def __init__(self, sock: socket.socket | None, name: str):
+        self.sock = sock
+        self.name = name
+        self.codec = JSON
+        self.compressor: FrameCompressor | None = None
+        self.closed = False
+        self._queue: deque[tuple[bytes, bool]] = deque()
+        self._snapshot_pending = False
+        self._snapshot_in_flight = False
+        self._cond = threading.Condition()
+        self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name=f"writer-{self.name}", daemon=True)
+        self._thread.start()
+
+    def _wake(self):
+        self._cond.notify()
+
+    def _shutdown(self):
+        try:
+            # Wakes the connection's reader so it runs the usual disconnect path.
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def send(self, frame: bytes, snapshot: bool = False) -> bool:
+        with self._cond:
+            if self.closed:
+                return False
+            if snapshot:
+                self._queue.clear()
+                self._snapshot_pending = True
+            elif len(self._queue) >= self.MAX_PENDING:
+                self._queue.clear()
+                SEND_FAILURES.inc(reason="overflow")
+                if self._snapshot_pending and not self._snapshot_in_flight:
+                    print(f"[TCP] {self.name} is too far behind, disconnecting.")
+                    self._close_locked()
+                return False
+            self._queue.append((frame, snapshot))
+            self._wake()
+            return True
+
+    def close(self):
+        with self._cond:
+            self._close_locked()
+
+    def _close_locked(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._wake()
+        self._shutdown()
+
+    def _prepare(self, frame: bytes) -> bytes:
+        if self.compressor is None:
+            return frame
+        return self.compressor.compress(frame)
+
+    def _next_frame_locked(self) -> tuple[bytes, bool]:
+        frame, snapshot = self._queue.popleft()
+        self._snapshot_in_flight = snapshot
+        return frame, snapshot
+
+    def _frame_written(self, snapshot: bool, nbytes: int, seconds: float):
+        BYTES_SENT.inc(nbytes)
+        SEND_SECONDS.observe(seconds)
+        if snapshot:
+            with self._cond:
+                self._snapshot_in_flight = False
+                if not any(queued_snapshot for _, queued_snapshot in self._queue):
+                    self._snapshot_pending = False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self.closed:
+                    self._cond.wait()
+                if self.closed:
+                    return
+                frame, snapshot = self._next_frame_locked()
+            data = self._prepare(frame)
+            start = time.perf_counter()
+            if not send_frame(self.sock, data):
+                SEND_FAILURES.inc(reason="error")
+                self.close()
+                return
+            self._frame_written(snapshot, len(data), time.perf_counter() - start)
+
+
+class ScoringRules:
+    """Points and penalties of the competitive multiplayer mode.
+
+    Lobby asks its rules object what every action is worth, so a variant only
+    needs a subclass that overrides these hooks.
+    """
+    reveal_points = 1
+    mine_penalty = 10
+    stun_seconds = 3.0
+    flag_points = 5
+
+    def on_reveal(self, player: Player, cells: int):
+        player.score += cells * self.reveal_points
+
+    def on_mine(self, player: Player, hits: int):
+        player.score -= hits * self.mine_penalty
+        player.stunned_until = time.time() + self.stun_seconds
+
+    def on_flag(self, player: Player, placed: bool, on_mine: bool):
+        correct = placed == on_mine
+        player.score += self.flag_points if correct else -self.flag_points
+
+
 class Lobby:
-    def __init__(self, lobby_id: str, difficulty_name: str):
+    def __init__(self, lobby_id: str, diff: Difficulty, rules: ScoringRules | None = None):
         self.id = lobby_id
-        self.diff_name = difficulty_name
-        self.diff = DIFFICULTIES.get(difficulty_name, DIFFICULTIES["Easy"])
+        self.diff_name = diff.name
+        self.diff = diff
+        self.rules = rules or ScoringRules()
 
         self.state = "waiting"
         self.players: dict[str, Player] = {}
-        self.sockets: dict[str, socket.socket] = {}
+        self.clients: dict[str, ClientWriter] = {}
 
         self.rows = self.diff.rows
         self.cols = self.diff.cols
         self.mines_total = self.diff.mines
-        self.mines = set()
-        self.adj = [[0 for _ in range(self.cols)] for _ in range(self.rows)]
-        self.revealed = [[False for _ in range(self.cols)] for _ in range(self.rows)]
-        self.flags = {}
-
-        self.first_click = True
-        self.game_over = False
-        self.won = False
-        self.game_start_time = None
-        self.game_duration = 0
+        # A new Board starts out reset; only the game state is set up here.
+        self.board = Board(self.rows, self.cols, self.mines_total)
+        self._reset_game()
 
         self.chat_log = []
         self.lock = threading.Lock()
+        self.deleted = False
+        self.created = time.monotonic()
+
+        # Delta broadcast bookkeeping: everything changed since the last
+        # state message went out, plus what the clients were last told.
+        self.seq = 0
+        self._chat_sent = 0
+        self._players_sent = None
+        self._scalars_sent = None
+
+    @property
+    def game_over(self) -> bool:
+        return self.board.game_over
+
+    @property
+    def won(self) -> bool:
+        return self.board.won
+
+    def reset_board(self):
+        self.board.reset()
+        self._reset_game()
+
+    def _reset_game(self):
+        self.game_start_time = None
+        self.game_duration = 0
+        self._dirty_cells = array("i")
+        self._dirty_flags: dict[int, str | None] = {}
+        self._needs_snapshot = True
 
     def get_neighbors(self, r: int, c: int):
-        for dr in (-1, 0, 1):
-            for dc in (-1, 0, 1):
-                if dr == 0 and dc == 0:
-                    continue
-                nr, nc = r + dr, c + dc
-                if 0 <= nr < self.rows and 0 <= nc < self.cols:
-                    yield nr, nc
-
-    def _place_mines(self, safe_r: int, safe_c: int):
-        forbidden = {(safe_r, safe_c)} | set(self.get_neighbors(safe_r, safe_c))
-        candidates = [(r, c) for r in range(self.rows) for c in range(self.cols) if (r, c) not in forbidden]
-        if len(candidates) < self.mines_total:
-            forbidden = {(safe_r, safe_c)}
-            candidates = [(r, c) for r in range(self.rows) for c in range(self.cols) if (r, c) not in forbidden]
-        self.mines = set(random.sample(candidates, self.mines_total))
-
-        for r in range(self.rows):
-            for c in range(self.cols):
-                if (r, c) in self.mines:
-                    self.adj[r][c] = -1
-                else:
-                    self.adj[r][c] = sum((nr, nc) in self.mines for nr, nc in self.get_neighbors(r, c))
+        return self.board.neighbors(r, c)
 
     def elapsed_seconds(self) -> int:
         if self.game_start_time is None:
@@ -87,16 +246,54 @@ class Lobby:
             return int(self.game_duration)
         return int(time.time() - self.game_start_time)
 
+    @contextmanager
+    def locked(self):
+        """Holds the lobby lock, recording how long acquiring it took."""
+        start = time.perf_counter()
+        with self.lock:
+            LOCK_WAIT.observe(time.perf_counter() - start)
+            yield self
+
+    @LOBBY_SECONDS.timed(op="to_dict")
     def to_dict(self) -> dict:
         """Returns the public state of the lobby, hiding unrevealed mine positions."""
-        revealed_cells = []
-        for r in range(self.rows):
-            for c in range(self.cols):
-                if self.revealed[r][c]:
-                    revealed_cells.append([r, c, self.adj[r][c]])
-                elif self.game_over and (r, c) in self.mines:
-                    revealed_cells.append([r, c, -1])
+        board = self.board
+        revealed_cells = [[r, c, n] for r, c, n in board.revealed_cells()]
+        if self.game_over:
+            revealed_cells.extend([r, c, -1] for r, c in board.mine_cells() if not board.is_revealed(r, c))
+
+        flags_list = [[r, c, pid] for r, c, pid in board.flagged_cells()]
+
+        return {
+            "lobby_id": self.id,
+            "difficulty": self.diff_name,
+            "rows": self.rows,
+            "cols": self.cols,
+            "mines_total": self.mines_total,
+            **self._scalars(),
+            "revealed_cells": revealed_cells,
+            "flags": flags_list,
+            "players": self._players_list(),
+            "chat": self.chat_log[-30:]
+        }
+
+    def summary(self) -> dict:
+        """The lobby's entry in the lobby directory."""
+        return {
+            "lobby_id": self.id,
+            "difficulty": self.diff_name,
+            "player_count": sum(1 for p in self.players.values() if p.connected),
+            "state": self.state,
+            "rows": self.rows,
+            "cols": self.cols,
+            "mines": self.mines_total,
+        }
+
+    def _publish(self):
+        if not self.deleted:
+            directory.update(self.summary())
 
+    def _players_list(self) -> list[dict]:
         players_list = []
         now = time.time()
         for p in self.players.values():
@@ -112,173 +309,227 @@ class Lobby:
             })
 
         players_list.sort(key=lambda x: x["score"], reverse=True)
+        return players_list
 
-        flags_list = [[r, c, pid] for (r, c), pid in self.flags.items()]
-
+    def _scalars(self) -> dict:
         return {
-            "lobby_id": self.id,
-            "difficulty": self.diff_name,
-            "rows": self.rows,
-            "cols": self.cols,
-            "mines_total": self.mines_total,
+            "flag_count": self.board.flag_count,
+            "safe_remaining": self.board.safe_remaining,
             "state": self.state,
-            "revealed_cells": revealed_cells,
-            "flags": flags_list,
             "game_over": self.game_over,
             "won": self.won,
             "elapsed_seconds": self.elapsed_seconds(),
-            "players": players_list,
-            "chat": self.chat_log[-30:]
         }
 
+    def _mark_sent(self):
+        self._dirty_cells = array("i")
+        self._dirty_flags = {}
+        self._needs_snapshot = False
+        self._chat_sent = len(self.chat_log)
+        self._players_sent = [astuple(p) for p in self.players.values()]
+        scalars = self._scalars()
+        del scalars["elapsed_seconds"]
+        self._scalars_sent = scalars
+
+    def snapshot_message(self) -> dict:
+        return {"event": "state_update", "seq": self.seq, "lobby": self.to_dict()}
+
+    def delta_message(self) -> dict | None:
+        """Returns the changes since the last broadcast, or None if there are none."""
+        board = self.board
+        cols = self.cols
+        cells = []
+        for i in self._dirty_cells:
+            r, c = divmod(i, cols)
+            cells.append([r, c, board.value(r, c)])
+        if self.game_over and not self._scalars_sent["game_over"]:
+            cells.extend([r, c, -1] for r, c in board.mine_cells() if not board.is_revealed(r, c))
+        flags = [[i // cols, i % cols, owner] for i, owner in self._dirty_flags.items()]
+        chat = self.chat_log[self._chat_sent:]
+        scalars = self._scalars()
+        comparable = dict(scalars)
+        del comparable["elapsed_seconds"]
+        players_changed = [astuple(p) for p in self.players.values()] != self._players_sent
+
+        if not (cells or flags or chat or players_changed or comparable != self._scalars_sent):
+            return None
+        msg = {"event": "state_delta", "seq": self.seq + 1, **scalars, "cells": cells, "flags": flags, "chat": chat}
+        if players_changed:
+            msg["players"] = self._players_list()
+        return msg
+
+    def send_snapshot(self, player_id: str, snapshot: EncodedMessage | None = None):
+        client = self.clients.get(player_id)
+        if client is None:
+            return
+        if snapshot is None:
+            snapshot = EncodedMessage(self.snapshot_message())
+        if not client.send(snapshot.frame(client.codec), snapshot=True):
+            print(f"Failed to send to player {player_id}, disconnecting them.")
+            self.players[player_id].connected = False
+            self._publish()
+
     def broadcast_state(self):
-        state = self.to_dict()
-        msg = {"event": "state_update", "lobby": state}
-        for player_id, sock in list(self.sockets.items()):
-            if self.players[player_id].connected:
-                success = send_msg(sock, msg)
-                if not success:
-                    print(f"Failed to send to player {player_id}, disconnecting them.")
-                    self.players[player_id].connected = False
+        """Sends every connected player what changed since the last broadcast.
+
+        A full snapshot goes out instead after the board was reset; joins and
+        resync requests are answered with send_snapshot().
+        """
+        started = time.perf_counter()
+        if self._needs_snapshot:
+            self.seq += 1
+            msg = self.snapshot_message()
+        else:
+            msg = self.delta_message()
+            if msg is None:
+                return
+            self.seq += 1
+        self._mark_sent()
+        BROADCASTS.inc(kind=msg["event"])
+        # Encoded lazily, once per codec in use, not once per client.
+        message = EncodedMessage(msg)
+        is_snapshot = msg["event"] == "state_update"
+        for codec in {client.codec for client in self.clients.values()}:
+            message.frame(codec)
+        encoded = time.perf_counter()
+
+        fanout = 0
+        bytes_sent = 0
+        snapshot = message if is_snapshot else None
+        for player_id, client in list(self.clients.items()):
+            if not self.players[player_id].connected:
+                continue
+            fanout += 1
+            frame = message.frame(client.codec)
+            bytes_sent += len(frame)
+            if client.send(frame, snapshot=is_snapshot):
+                continue
+            if client.closed:
+                print(f"Failed to send to player {player_id}, disconnecting them.")
+                self.players[player_id].connected = False
+                continue
+            # The client's backlog overflowed and was dropped: catch it up
+            # with one snapshot instead of the deltas it missed.
+            if snapshot is None:
+                snapshot = EncodedMessage(self.snapshot_message())
+            self.send_snapshot(player_id, snapshot)
+        finished = time.perf_counter()
+
+        BROADCAST_FRAMES.inc(fanout)
+        BROADCAST_BYTES.inc(bytes_sent)
+        BROADCAST_SECONDS.observe(encoded - started, phase="encode")
+        BROADCAST_SECONDS.observe(finished - encoded, phase="fanout")
+        # Every change a lobby listing shows (players joining or leaving,
+        # the game starting or ending) is followed by a broadcast.
+        self._publish()
 
     def add_chat(self, sender: str, text: str):
         self.chat_log.append({"sender": sender, "text": text, "timestamp": time.time()})
 
     def check_win(self) -> bool:
-        revealed_count = sum(1 for r in range(self.rows) for c in range(self.cols) if self.revealed[r][c])
-        if revealed_count == self.rows * self.cols - self.mines_total:
-            self.game_over = True
-            self.won = True
+        if self.board.revealed_count == self.board.safe_total:
+            self.board.game_over = True
+            self.board.won = True
             self.game_duration = time.time() - self.game_start_time
             self.state = "finished"
 
-            ScoreManager.add_score(self.diff_name, int(self.game_duration))
+            # Highscores are kept per preset only; every custom size would
+            # otherwise add its own table to scores.json.
+            if not self.diff.is_custom:
+                ScoreManager.add_score(self.diff_name, int(self.game_duration))
             self.add_chat("System", f"Game Won in {int(self.game_duration)} seconds!")
             return True
         return False
 
-    def reveal(self, player_id: str, r: int, c: int):
+    def _active_player(self, player_id: str) -> Player | None:
         if self.game_over or self.state != "playing":
-            return
+            return None
         player = self.players.get(player_id)
         if not player or player.stunned_until > time.time():
+            return None
+        return player
+
+    @LOBBY_SECONDS.timed(op="reveal")
+    def reveal(self, player_id: str, r: int, c: int):
+        player = self._active_player(player_id)
+        if not player:
             return
-        if (r, c) in self.flags or self.revealed[r][c]:
+        board = self.board
+        if board.is_flagged(r, c) or board.is_revealed(r, c):
             return
 
-        if self.first_click:
-            self._place_mines(r, c)
-            self.first_click = False
+        if board.ensure_mines(r, c):
             self.game_start_time = time.time()
 
-        if (r, c) in self.mines:
-            player.score -= 10
-            player.stunned_until = time.time() + 3.0
-            self.revealed[r][c] = True
-            self.add_chat("System", f"[!] {player.nickname} hit a mine (-10 pts, 3s stun)!")
+        if board.is_mine(r, c):
+            board.reveal_mine(r, c)
+            self._dirty_cells.append(r * self.cols + c)
+            self.rules.on_mine(player, 1)
+            self.add_chat("System", f"[!] {player.nickname} hit a mine "
+                                    f"(-{self.rules.mine_penalty} pts, {self.rules.stun_seconds:g}s stun)!")
             self.check_win()
             return
 
-        revealed_cells = set()
-        stack = [(r, c)]
-        while stack:
-            cr, cc = stack.pop()
-            if self.revealed[cr][cc] or (cr, cc) in self.flags or (cr, cc) in self.mines:
-                continue
-            self.revealed[cr][cc] = True
-            revealed_cells.add((cr, cc))
-            if self.adj[cr][cc] == 0:
-                for nr, nc in self.get_neighbors(cr, cc):
-                    if not self.revealed[nr][nc] and (nr, nc) not in self.mines:
-                        stack.append((nr, nc))
-
-        points = len(revealed_cells)
-        player.score += points
+        revealed_cells = board.flood_reveal(r, c)
+        self._dirty_cells.extend(revealed_cells)
+        self.rules.on_reveal(player, len(revealed_cells))
 
         self.check_win()
 
     def toggle_flag(self, player_id: str, r: int, c: int):
-        if self.game_over or self.state != "playing":
-            return
-        player = self.players.get(player_id)
-        if not player or player.stunned_until > time.time():
+        player = self._active_player(player_id)
+        if not player:
             return
-        if self.revealed[r][c]:
+        board = self.board
+        if board.is_revealed(r, c):
             return
 
-        if (r, c) in self.flags:
-            owner_id = self.flags[(r, c)]
-            if owner_id == player_id:
-                del self.flags[(r, c)]
-                if (r, c) in self.mines:
-                    player.score -= 5
-                else:
-                    player.score += 5
+        if board.is_flagged(r, c):
+            if board.flag_owner(r, c) == player_id:
+                board.clear_flag(r, c)
+                self._dirty_flags[r * self.cols + c] = None
+                self.rules.on_flag(player, False, board.is_mine(r, c))
         else:
-            self.flags[(r, c)] = player_id
-            if (r, c) in self.mines:
-                player.score += 5
-            else:
-                player.score -= 5
+            board.set_flag(r, c, player_id)
+            self._dirty_flags[r * self.cols + c] = player_id
+            self.rules.on_flag(player, True, board.is_mine(r, c))
 
+    @LOBBY_SECONDS.timed(op="chord")
     def chord(self, player_id: str, r: int, c: int):
-        if self.game_over or self.state != "playing" or self.first_click:
-            return
-        player = self.players.get(player_id)
-        if not player or player.stunned_until > time.time():
-            return
-        if not self.revealed[r][c] or self.adj[r][c] <= 0:
-            return
-
-        n = self.adj[r][c]
-        flagged_around = sum((nr, nc) in self.flags for nr, nc in self.get_neighbors(r, c))
-        if flagged_around != n:
+        player = self._active_player(player_id)
+        if not player or self.board.first_click:
             return
+        board = self.board
 
         revealed_safe = 0
         hit_mines = 0
 
-        for nr, nc in list(self.get_neighbors(r, c)):
-            if (nr, nc) in self.flags or self.revealed[nr][nc]:
+        for nr, nc in board.chord_targets(r, c):
+            if board.is_revealed(nr, nc):
                 continue
-            if (nr, nc) in self.mines:
+            if board.is_mine(nr, nc):
                 hit_mines += 1
-                self.revealed[nr][nc] = True
+                board.reveal_mine(nr, nc)
+                self._dirty_cells.append(nr * self.cols + nc)
             else:
-                stack = [(nr, nc)]
-                while stack:
-                    cr, cc = stack.pop()
-                    if self.revealed[cr][cc] or (cr, cc) in self.flags or (cr, cc) in self.mines:
-                        continue
-                    self.revealed[cr][cc] = True
-                    revealed_safe += 1
-                    if self.adj[cr][cc] == 0:
-                        for nnr, nnc in self.get_neighbors(cr, cc):
-                            if not self.revealed[nnr][nnc] and (nnr, nnc) not in self.mines:
-                                stack.append((nnr, nnc))
+                opened = board.flood_reveal(nr, nc)
+                self._dirty_cells.extend(opened)
+                revealed_safe += len(opened)
 
         if hit_mines > 0:
-            player.score -= 10 * hit_mines
-            player.stunned_until = time.time() + 3.0
+            self.rules.on_mine(player, hit_mines)
             self.add_chat("System",
-                          f"[!] {player.nickname} hit {hit_mines} mine(s) during chord (-{10 * hit_mines} pts, 3s stun)!")
+                          f"[!] {player.nickname} hit {hit_mines} mine(s) during chord "
+                          f"(-{self.rules.mine_penalty * hit_mines} pts, {self.rules.stun_seconds:g}s stun)!")
 
         if revealed_safe > 0:
-            player.score += revealed_safe
+            self.rules.on_reveal(player, revealed_safe)
 
         self.check_win()
 
     def restart(self):
         self.state = "playing"
-        self.first_click = True
-        self.game_over = False
-        self.won = False
-        self.game_start_time = None
-        self.game_duration = 0
-        self.mines.clear()
-        self.flags.clear()
-        self.adj = [[0 for _ in range(self.cols)] for _ in range(self.rows)]
-        self.revealed = [[False for _ in range(self.cols)] for _ in range(self.rows)]
+        self.reset_board()
         for p in self.players.values():
             p.score = 0
             p.stunned_until = 0
@@ -288,6 +539,135 @@ class Lobby:
 lobbies: dict[str, Lobby] = {}
 lobbies_lock = threading.Lock()
 
+# A large custom board holds megabytes, so the number of lobbies is capped and
+# lobbies nobody is connected to are deleted after a while.
+MAX_LOBBIES = 200
+EMPTY_LOBBY_SECONDS = 120
+
+# Longest a GET /api/lobbies/updates request is held open waiting for a change.
+MAX_POLL_SECONDS = 60
+
+
+class LobbyDirectory:
+    """The GET /api/lobbies listing, kept current by the lobbies themselves.
+
+    Lobbies push their summary whenever it may have changed, so serving the
+    listing takes no lobby lock. The JSON body is rebuilt at most once per
+    change and is identified by an ETag made of a per-process id and the
+    directory version; the same pair, unquoted, is the cursor of
+    GET /api/lobbies/updates, which waits for changes after it.
+    """
+    LOG_SIZE = 256
+
+    def __init__(self):
+        self.version = 0
+        self._instance = uuid.uuid4().hex[:8]
+        self._entries: dict[str, dict] = {}
+        self._body: tuple[str, bytes] | None = None
+        # (version, lobby_id, summary or None once deleted) per change
+        self._log: deque[tuple[int, str, dict | None]] = deque(maxlen=self.LOG_SIZE)
+        self._lock = threading.Lock()
+        self._changed_cond = threading.Condition(self._lock)
+
+    def update(self, summary: dict):
+        with self._lock:
+            if self._entries.get(summary["lobby_id"]) == summary:
+                return
+            self._entries[summary["lobby_id"]] = summary
+            self._changed(summary["lobby_id"], summary)
+
+    def remove(self, lobby_id: str):
+        with self._lock:
+            if self._entries.pop(lobby_id, None) is not None:
+                self._changed(lobby_id, None)
+
+    def _changed(self, lobby_id: str, summary: dict | None):
+        self.version += 1
+        self._body = None
+        self._log.append((self.version, lobby_id, summary))
+        self._changed_cond.notify_all()
+
+    def _cursor(self) -> str:
+        return f"{self._instance}-{self.version}"
+
+    def body(self) -> tuple[str, bytes]:
+        """Returns (ETag, JSON body) of the current listing."""
+        with self._lock:
+            if self._body is None:
+                data = json.dumps(list(self._entries.values())).encode("utf-8")
+                self._body = (f'"{self._cursor()}"', data)
+            return self._body
+
+    def changes_since(self, cursor: str | None, timeout: float) -> dict:
+        """Waits up to `timeout` seconds for changes after `cursor` and returns them.
+
+        The reply carries the new cursor and, per changed lobby, its latest
+        summary (None once deleted). A missing, foreign or too old cursor is
+        answered at once with the whole listing and "reset" set instead.
+        """
+        instance, _, version = (cursor or "").partition("-")
+        with self._lock:
+            since = int(version) if instance == self._instance and version.isdigit() else None
+            if since is not None and since > self.version:
+                since = None
+            if since == self.version:
+                self._changed_cond.wait_for(lambda: self.version > since, timeout)
+            if since is None or (since < self.version and self._log[0][0] > since + 1):
+                return {"cursor": self._cursor(), "reset": True, "lobbies": list(self._entries.values())}
+            latest: dict[str, dict | None] = {}
+            for changed, lobby_id, summary in self._log:
+                if changed > since:
+                    latest.pop(lobby_id, None)
+                    latest[lobby_id] = summary
+            return {"cursor": self._cursor(), "reset": False,
+                    "changes": [{"lobby_id": lobby_id, "lobby": summary} for lobby_id, summary in latest.items()]}
+
+
+class HighscoreCache:
+    """GET /api/highscores body, re-read only when scores.json changes on disk.
+
+    A stat per request replaces reading and parsing the file; the ETag is
+    derived from the file's modification time and size.
+    """
+
+    def __init__(self):
+        self._stamp = ()
+        self._body: tuple[str, bytes] | None = None
+        self._lock = threading.Lock()
+
+    def body(self) -> tuple[str, bytes]:
+        try:
+            st = os.stat(ScoreManager.FILE)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        with self._lock:
+            if self._body is None or stamp != self._stamp:
+                data = json.dumps(ScoreManager.load()).encode("utf-8")
+                tag = f"{stamp[0]:x}-{stamp[1]:x}" if stamp else "none"
+                self._stamp, self._body = stamp, (f'"{tag}"', data)
+            return self._body
+
+
+directory = LobbyDirectory()
+highscores = HighscoreCache()
+
+def difficulty_from_request(body) -> Difficulty:
+    """Board size for POST /api/lobbies: a preset name or custom rows/cols/mines."""
+    if not isinstance(body, dict):
+        raise ValueError("request body must be a JSON object")
+    if any(k in body for k in ("rows", "cols", "mines")):
+        custom = Difficulty.custom(body.get("rows"), body.get("cols"), body.get("mines"), MAX_ROWS, MAX_COLS)
+        for diff in DIFFICULTIES.values():
+            if (diff.rows, diff.cols, diff.mines) == (custom.rows, custom.cols, custom.mines):
+                return diff
+        return custom
+    name = body.get("difficulty", "Easy")
+    if name not in DIFFICULTIES:
+        raise ValueError(f"unknown difficulty {name!r}")
+    return DIFFICULTIES[name]
+
+
 PLAYER_COLORS = ["#ef4444", "#3b82f6", "#10b981", "#f59e0b", "#8b5cf6", "#ec4899", "#14b8a6", "#f97316"]
 
 
@@ -296,65 +676,112 @@ def get_random_color():
 
 
 class MinesweeperHTTPHandler(BaseHTTPRequestHandler):
+    # Keep-alive: every response carries a Content-Length, and a connection
+    # idle for longer than `timeout` seconds is dropped to free its thread.
+    # Headers and body go out in separate writes, so Nagle's algorithm would
+    # hold the body back until the client's delayed ACK on a reused connection.
+    protocol_version = "HTTP/1.1"
+    timeout = 30
+    disable_nagle_algorithm = True
+
     def log_message(self, format, *args):
         pass
 
+    def send_text(self, status_code: int, text: str, content_type: str):
+        body = text.encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_cached(self, etag: str, body: bytes):
+        """Sends a cacheable JSON body, or 304 Not Modified if the client holds it already."""
+        if etag in (tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
     def send_json(self, status_code: int, data: dict):
+        body = json.dumps(data).encode("utf-8")
         self.send_response(status_code)
         self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
         self.send_header("Access-Control-Allow-Origin", "*")
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode("utf-8"))
+        self.wfile.write(body)
 
     def do_GET(self):
         parsed_url = urllib.parse.urlparse(self.path)
         path = parsed_url.path
 
         if path == "/api/lobbies":
+            self.send_cached(*directory.body())
+        elif path == "/api/lobbies/updates":
+            query = urllib.parse.parse_qs(parsed_url.query)
+            try:
+                timeout = float(query.get("timeout", ["25"])[0])
+            except ValueError:
+                timeout = math.nan
+            if not math.isfinite(timeout):
+                self.send_json(400, {"error": "timeout must be a finite number of seconds"})
+                return
+            timeout = min(max(timeout, 0.0), MAX_POLL_SECONDS)
+            self.send_json(200, directory.changes_since(query.get("since", [None])[0], timeout))
+        elif path == "/api/metrics":
             with lobbies_lock:
-                lobby_list = []
-                for lobby in lobbies.values():
-                    with lobby.lock:
-                        lobby_list.append({
-                            "lobby_id": lobby.id,
-                            "difficulty": lobby.diff_name,
-                            "player_count": sum(1 for p in lobby.players.values() if p.connected),
-                            "state": lobby.state,
-                            "rows": lobby.rows,
-                            "cols": lobby.cols,
-                        })
-            self.send_json(200, lobby_list)
+                LOBBY_COUNT.set(len(lobbies))
+            self.send_text(200, REGISTRY.render(), CONTENT_TYPE)
         elif path == "/api/highscores":
-            scores = ScoreManager.load()
-            self.send_json(200, scores)
+            self.send_cached(*highscores.body())
         else:
             self.send_json(404, {"error": "Not Found"})
 
     def do_POST(self):
         parsed_url = urllib.parse.urlparse(self.path)
         path = parsed_url.path
+        # Read the body even when it is not used, or it would be parsed as
+        # the next request on this kept-alive connection.
+        content_length = int(self.headers.get("Content-Length", 0))
+        post_data = self.rfile.read(content_length)
 
         if path == "/api/lobbies":
-            content_length = int(self.headers.get("Content-Length", 0))
-            post_data = self.rfile.read(content_length)
             try:
                 body = json.loads(post_data.decode("utf-8"))
             except Exception:
                 body = {}
 
-            difficulty_name = body.get("difficulty", "Easy")
-            if difficulty_name not in DIFFICULTIES:
-                difficulty_name = "Easy"
+            try:
+                diff = difficulty_from_request(body)
+            except ValueError as e:
+                self.send_json(400, {"error": str(e)})
+                return
 
             lobby_id = str(uuid.uuid4())[:8]
-            lobby = Lobby(lobby_id, difficulty_name)
+            with lobbies_lock:
+                full = len(lobbies) >= MAX_LOBBIES
+            if full:
+                self.send_json(503, {"error": "too many lobbies, try again later"})
+                return
+            lobby = Lobby(lobby_id, diff)
 
             with lobbies_lock:
                 lobbies[lobby_id] = lobby
+            lobby._publish()
 
             self.send_json(201, {
                 "lobby_id": lobby_id,
-                "difficulty": difficulty_name,
+                "difficulty": diff.name,
                 "rows": lobby.rows,
                 "cols": lobby.cols,
                 "mines": lobby.mines_total,
@@ -363,164 +790,207 @@ class MinesweeperHTTPHandler(BaseHTTPRequestHandler):
             self.send_json(404, {"error": "Not Found"})
 
 
+class ClientSession:
+    """Protocol state of one TCP client, independent of how its bytes travel.
+
+    The threaded server and the asyncio server both feed decoded messages to
+    handle() and call close() once the connection is gone.
+    """
+
+    def __init__(self, writer: ClientWriter, addr):
+        self.writer = writer
+        self.addr = addr
+        self.player_id = None
+        self.lobby_id = None
+
+    def handle(self, msg: dict) -> bool:
+        """Applies one client message; returns False when the client leaves."""
+        action = msg.get("action")
+        ACTION_COUNT.inc(action=action if action in ACTIONS else "unknown")
+
+        if action == "join":
+            req_lobby_id = msg.get("lobby_id")
+            nickname = msg.get("nickname", "Anonymous")[:12]
+
+            with lobbies_lock:
+                lobby = lobbies.get(req_lobby_id)
+
+            if not lobby:
+                self.writer.send(encode_msg({"error": "Lobby not found"}))
+                return True
+
+            with lobby.locked():
+                # Emptied and deleted since it was looked up.
+                if lobby.deleted:
+                    self.writer.send(encode_msg({"error": "Lobby not found"}))
+                    return True
+                self.player_id = str(uuid.uuid4())[:6]
+                self.lobby_id = req_lobby_id
+
+                is_host = (sum(1 for p in lobby.players.values() if p.connected) == 0)
+                color = get_random_color()
+                existing_colors = [p.color for p in lobby.players.values() if p.connected]
+                for col in PLAYER_COLORS:
+                    if col not in existing_colors:
+                        color = col
+                        break
+
+                player = Player(
+                    id=self.player_id,
+                    nickname=nickname,
+                    color=color,
+                    score=0,
+                    stunned_until=0.0,
+                    is_host=is_host,
+                    connected=True
+                )
+                lobby.players[self.player_id] = player
+                lobby.add_chat("System", f"[+] {nickname} joined the game!")
+                # Flush the join to everyone else first, so the newcomer's
+                # snapshot and the following deltas line up by sequence.
+                lobby.broadcast_state()
+
+                self.writer.codec = negotiate_codec(msg.get("codecs"))
+                compression = negotiate_compression(msg.get("compression"))
+                if compression and self.writer.compressor is None:
+                    self.writer.compressor = FrameCompressor()
+                lobby.clients[self.player_id] = self.writer
+                self.writer.send(encode_msg({"event": "join_success", "player_id": self.player_id,
+                                             "codec": self.writer.codec, "compression": compression}))
+                lobby.send_snapshot(self.player_id)
+
+        elif action == "leave":
+            return False
+
+        elif action == "resync":
+            if not self.lobby_id or not self.player_id:
+                return True
+            with lobbies_lock:
+                lobby = lobbies.get(self.lobby_id)
+            if lobby:
+                with lobby.locked():
+                    lobby.send_snapshot(self.player_id)
+
+        elif action == "chat":
+            if not self.lobby_id or not self.player_id:
+                return True
+            with lobbies_lock:
+                lobby = lobbies.get(self.lobby_id)
+            if lobby:
+                with lobby.locked():
+                    player = lobby.players.get(self.player_id)
+                    chat_text = msg.get("message", "").strip()[:80]
+                    if player and chat_text:
+                        lobby.add_chat(player.nickname, chat_text)
+                        lobby.broadcast_state()
+
+        elif action == "start_game":
+            if not self.lobby_id or not self.player_id:
+                return True
+            with lobbies_lock:
+                lobby = lobbies.get(self.lobby_id)
+            if lobby:
+                with lobby.locked():
+                    player = lobby.players.get(self.player_id)
+                    if player and player.is_host:
+                        lobby.state = "playing"
+                        lobby.reset_board()
+                        for p in lobby.players.values():
+                            p.score = 0
+                            p.stunned_until = 0.0
+                        lobby.add_chat("System", "🎮 Game started! Reveal tiles to earn points.")
+                        lobby.broadcast_state()
+
+        elif action in ("reveal", "flag", "chord"):
+            if not self.lobby_id or not self.player_id:
+                return True
+            r = msg.get("row")
+            c = msg.get("col")
+            if r is None or c is None:
+                return True
+
+            with lobbies_lock:
+                lobby = lobbies.get(self.lobby_id)
+            if lobby:
+                with lobby.locked():
+                    if 0 <= r < lobby.rows and 0 <= c < lobby.cols:
+                        if action == "reveal":
+                            lobby.reveal(self.player_id, r, c)
+                        elif action == "flag":
+                            lobby.toggle_flag(self.player_id, r, c)
+                        elif action == "chord":
+                            lobby.chord(self.player_id, r, c)
+                        lobby.broadcast_state()
+
+        elif action == "restart":
+            if not self.lobby_id or not self.player_id:
+                return True
+            with lobbies_lock:
+                lobby = lobbies.get(self.lobby_id)
+            if lobby:
+                with lobby.locked():
+                    player = lobby.players.get(self.player_id)
+                    if player and lobby.game_over:
+                        lobby.restart()
+                        lobby.broadcast_state()
+        return True
+
+    def close(self):
+        if not self.lobby_id or not self.player_id:
+            return
+        with lobbies_lock:
+            lobby = lobbies.get(self.lobby_id)
+        if lobby:
+            with lobby.locked():
+                player = lobby.players.get(self.player_id)
+                if player:
+                    player.connected = False
+                    lobby.add_chat("System", f"[-] {player.nickname} disconnected.")
+                    if player.is_host:
+                        player.is_host = False
+                        active_players = [p for p in lobby.players.values() if p.connected]
+                        if active_players:
+                            active_players[0].is_host = True
+                            lobby.add_chat("System", f"[Host] {active_players[0].nickname} is now the host.")
+
+                    if self.player_id in lobby.clients:
+                        del lobby.clients[self.player_id]
+
+                    active_count = sum(1 for p in lobby.players.values() if p.connected)
+                    if active_count == 0:
+                        print(f"[Lobby] Lobby {self.lobby_id} is now empty. Deleting lobby.")
+                        delete_lobby(lobby)
+                    else:
+                        lobby.broadcast_state()
+
+
 def handle_tcp_client(client_sock: socket.socket, addr):
     print(f"[TCP] New connection from {addr}")
-    player_id = None
-    lobby_id = None
+    CONNECTIONS.inc()
+    OPEN_CONNECTIONS.inc()
+    writer = ClientWriter(client_sock, f"{addr[0]}:{addr[1]}")
+    session = ClientSession(writer, addr)
+    reader = FrameReader(client_sock, max_frame=MAX_CLIENT_FRAME)
 
     try:
+        counted = 0
         while True:
-            msg = recv_msg(client_sock)
-            if not msg:
-                break
-
-            action = msg.get("action")
-
-            if action == "join":
-                req_lobby_id = msg.get("lobby_id")
-                nickname = msg.get("nickname", "Anonymous")[:12]
-
-                with lobbies_lock:
-                    lobby = lobbies.get(req_lobby_id)
-
-                if not lobby:
-                    send_msg(client_sock, {"error": "Lobby not found"})
-                    continue
-
-                with lobby.lock:
-                    player_id = str(uuid.uuid4())[:6]
-                    lobby_id = req_lobby_id
-
-                    is_host = (sum(1 for p in lobby.players.values() if p.connected) == 0)
-                    color = get_random_color()
-                    existing_colors = [p.color for p in lobby.players.values() if p.connected]
-                    for col in PLAYER_COLORS:
-                        if col not in existing_colors:
-                            color = col
-                            break
-
-                    player = Player(
-                        id=player_id,
-                        nickname=nickname,
-                        color=color,
-                        score=0,
-                        stunned_until=0.0,
-                        is_host=is_host,
-                        connected=True
-                    )
-                    lobby.players[player_id] = player
-                    lobby.sockets[player_id] = client_sock
-
-                    lobby.add_chat("System", f"[+] {nickname} joined the game!")
-
-                    send_msg(client_sock, {"event": "join_success", "player_id": player_id})
-                    lobby.broadcast_state()
-
-            elif action == "leave":
+            msg = reader.read_msg()
+            BYTES_RECEIVED.inc(reader.bytes_read - counted)
+            counted = reader.bytes_read
+            if not msg or not session.handle(msg):
                 break
-
-            elif action == "chat":
-                if not lobby_id or not player_id:
-                    continue
-                with lobbies_lock:
-                    lobby = lobbies.get(lobby_id)
-                if lobby:
-                    with lobby.lock:
-                        player = lobby.players.get(player_id)
-                        chat_text = msg.get("message", "").strip()[:80]
-                        if player and chat_text:
-                            lobby.add_chat(player.nickname, chat_text)
-                            lobby.broadcast_state()
-
-            elif action == "start_game":
-                if not lobby_id or not player_id:
-                    continue
-                with lobbies_lock:
-                    lobby = lobbies.get(lobby_id)
-                if lobby:
-                    with lobby.lock:
-                        player = lobby.players.get(player_id)
-                        if player and player.is_host:
-                            lobby.state = "playing"
-                            lobby.first_click = True
-                            lobby.game_over = False
-                            lobby.won = False
-                            lobby.mines.clear()
-                            lobby.flags.clear()
-                            lobby.revealed = [[False for _ in range(lobby.cols)] for _ in range(lobby.rows)]
-                            lobby.adj = [[0 for _ in range(lobby.cols)] for _ in range(lobby.rows)]
-                            for p in lobby.players.values():
-                                p.score = 0
-                                p.stunned_until = 0.0
-                            lobby.add_chat("System", "🎮 Game started! Reveal tiles to earn points.")
-                            lobby.broadcast_state()
-
-            elif action in ("reveal", "flag", "chord"):
-                if not lobby_id or not player_id:
-                    continue
-                r = msg.get("row")
-                c = msg.get("col")
-                if r is None or c is None:
-                    continue
-
-                with lobbies_lock:
-                    lobby = lobbies.get(lobby_id)
-                if lobby:
-                    with lobby.lock:
-                        if 0 <= r < lobby.rows and 0 <= c < lobby.cols:
-                            if action == "reveal":
-                                lobby.reveal(player_id, r, c)
-                            elif action == "flag":
-                                lobby.toggle_flag(player_id, r, c)
-                            elif action == "chord":
-                                lobby.chord(player_id, r, c)
-                            lobby.broadcast_state()
-
-            elif action == "restart":
-                if not lobby_id or not player_id:
-                    continue
-                with lobbies_lock:
-                    lobby = lobbies.get(lobby_id)
-                if lobby:
-                    with lobby.lock:
-                        player = lobby.players.get(player_id)
-                        if player and lobby.game_over:
-                            lobby.restart()
-                            lobby.broadcast_state()
-
+            # Only a client that negotiated compression may send it.
+            if reader.inflater is None and writer.compressor is not None:
+                reader.inflater = FrameDecompressor(MAX_CLIENT_FRAME)
     except ConnectionError:
         pass
     finally:
+        OPEN_CONNECTIONS.dec()
+        writer.close()
         client_sock.close()
         print(f"[TCP] Connection closed with {addr}")
-
-        if lobby_id and player_id:
-            with lobbies_lock:
-                lobby = lobbies.get(lobby_id)
-            if lobby:
-                with lobby.lock:
-                    player = lobby.players.get(player_id)
-                    if player:
-                        player.connected = False
-                        lobby.add_chat("System", f"[-] {player.nickname} disconnected.")
-                        if player.is_host:
-                            player.is_host = False
-                            active_players = [p for p in lobby.players.values() if p.connected]
-                            if active_players:
-                                active_players[0].is_host = True
-                                lobby.add_chat("System", f"[Host] {active_players[0].nickname} is now the host.")
-
-                        if player_id in lobby.sockets:
-                            del lobby.sockets[player_id]
-
-                        active_count = sum(1 for p in lobby.players.values() if p.connected)
-                        if active_count == 0:
-                            print(f"[Lobby] Lobby {lobby_id} is now empty. Deleting lobby.")
-                            with lobbies_lock:
-                                if lobby_id in lobbies:
-                                    del lobbies[lobby_id]
-                        else:
-                            lobby.broadcast_state()
+        session.close()
 
 
 def run_udp_discovery_server(server_name: str):
@@ -544,9 +1014,36 @@ def run_udp_discovery_server(server_name: str):
             break
 
 
+def delete_lobby(lobby: Lobby):
+    """Removes an empty lobby; the caller holds its lock."""
+    with lobbies_lock:
+        if lobbies.get(lobby.id) is lobby:
+            del lobbies[lobby.id]
+    lobby.deleted = True
+    directory.remove(lobby.id)
+
+
+def run_lobby_reaper(interval: float = 10.0):
+    """Deletes lobbies that have had no connected player for EMPTY_LOBBY_SECONDS.
+
+    Lobbies are deleted when their last player leaves, so this only catches
+    the ones created over HTTP that nobody ever joined.
+    """
+    while True:
+        time.sleep(interval)
+        now = time.monotonic()
+        with lobbies_lock:
+            idle = [lobby for lobby in lobbies.values() if now - lobby.created > EMPTY_LOBBY_SECONDS]
+        for lobby in idle:
+            with lobby.locked():
+                if not lobby.deleted and not any(p.connected for p in lobby.players.values()):
+                    print(f"[Lobby] Lobby {lobby.id} has nobody connected. Deleting lobby.")
+                    delete_lobby(lobby)
+
+
 def run_http_server():
-    server = HTTPServer(("", HTTP_PORT), MinesweeperHTTPHandler)
-    print(f"[HTTP] REST API running on port {HTTP_PORT}...")
+    server = ThreadingHTTPServer(("", HTTP_PORT), MinesweeperHTTPHandler)
+    print(f"[HTTP] REST API running on port {HTTP_PORT} (threaded, keep-alive)...")
     server.serve_forever()
 
 
@@ -567,23 +1064,33 @@ def run_tcp_server():
             break
 
 
-def start_all_servers(server_name="Local Minesweeper Server"):
+def start_all_servers(server_name="Local Minesweeper Server", use_asyncio: bool = False):
     udp_thread = threading.Thread(target=run_udp_discovery_server, args=(server_name,), daemon=True)
     udp_thread.start()
 
     http_thread = threading.Thread(target=run_http_server, daemon=True)
     http_thread.start()
 
-    run_tcp_server()
+    threading.Thread(target=run_lobby_reaper, daemon=True).start()
+
+    if use_asyncio:
+        from async_server import run_async_tcp_server
+        run_async_tcp_server()
+    else:
+        run_tcp_server()
 
 
 if __name__ == "__main__":
     import sys
 
     name = "Central Server"
-    if len(sys.argv) > 1:
-        name = sys.argv[1]
+    args = [arg for arg in sys.argv[1:] if arg != "--asyncio"]
+    if args:
+        name = args[0]
+    # Run as a script this file is __main__; register it as "server" too, so
+    # async_server shares its lobbies instead of importing a second copy.
+    sys.modules.setdefault("server", sys.modules["__main__"])
     try:
-        start_all_servers(name)
+        start_all_servers(name, use_asyncio="--asyncio" in sys.argv)
     except KeyboardInterrupt:
         print("\n[Server] Shutting down.")
\ No newline at end of file
@@ -0,0 +1,84 @@
+import random
+from collections import deque
+
+import pytest
+
+from engine import Board, count_adjacent, neighbor_deltas, pack_bits, random_mask
+
+SHAPES = [(1, 1), (1, 7), (7, 1), (2, 2), (9, 9), (16, 30), (23, 17)]
+
+
+def naive_neighbors(rows: int, cols: int, i: int) -> list[int]:
+    r, c = divmod(i, cols)
+    return [nr * cols + nc
+            for nr in range(r - 1, r + 2) for nc in range(c - 1, c + 2)
+            if (nr, nc) != (r, c) and 0 <= nr < rows and 0 <= nc < cols]
+
+
+def naive_flood(board: Board, start: int) -> set[int]:
+    """Cells a breadth-first flood from start would open, without touching the board."""
+    rows, cols = board.rows, board.cols
+    if board._revealed[start] or board._flags[start] or board._is_mine_index(start):
+        return set()
+    opened = {start}
+    queue = deque([start])
+    while queue:
+        i = queue.popleft()
+        if board._adj[i]:
+            continue
+        for ni in naive_neighbors(rows, cols, i):
+            if ni not in opened and not board._revealed[ni] and not board._flags[ni]:
+                opened.add(ni)
+                queue.append(ni)
+    return opened
+
+
+@pytest.mark.parametrize("rows,cols", SHAPES)
+def test_neighbor_deltas_match_bounds_checks(rows, cols):
+    table = neighbor_deltas(rows, cols)
+    for i in range(rows * cols):
+        assert sorted(i + d for d in table[i]) == naive_neighbors(rows, cols, i)
+
+
+@pytest.mark.parametrize("rows,cols", SHAPES)
+def test_count_adjacent_matches_naive_count(rows, cols):
+    rng = random.Random(rows * 100 + cols)
+    mask = bytes(rng.random() < 0.3 for _ in range(rows * cols))
+    adj = count_adjacent(mask, rows, cols)
+    for i in range(rows * cols):
+        assert adj[i] == sum(mask[ni] for ni in naive_neighbors(rows, cols, i))
+
+
+@pytest.mark.parametrize("size,count", [(1, 0), (2, 1), (81, 10), (480, 99), (1000, 500), (1000, 501), (1000, 990)])
+def test_random_mask_places_exactly_count_outside_excluded(size, count):
+    random.seed(size + count)
+    excluded = set(random.sample(range(size), min(9, size - count)))
+    for _ in range(20):
+        mask = random_mask(size, count, excluded)
+        assert len(mask) == size
+        assert mask.count(1) == count
+        assert not any(mask[i] for i in excluded)
+        bits = pack_bits(mask)
+        assert [(bits[i >> 3] >> (i & 7)) & 1 for i in range(size)] == list(mask)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_flood_reveal_matches_breadth_first_search(seed):
+    rng = random.Random(seed)
+    rows, cols = rng.randint(1, 25), rng.randint(1, 25)
+    mines = rng.randint(1, max(1, rows * cols // 5)) if rows * cols > 1 else 0
+    board = Board(rows, cols, mines)
+    random.seed(seed)
+    board.ensure_mines(rng.randrange(rows), rng.randrange(cols))
+    for _ in range(rng.randint(0, 8)):
+        board.set_flag(rng.randrange(rows), rng.randrange(cols))
+
+    for _ in range(10):
+        start = rng.randrange(rows * cols)
+        expected = naive_flood(board, start)
+        before = board.revealed_count
+        opened = board.flood_reveal(*divmod(start, cols))
+        assert len(opened) == len(set(opened))
+        assert set(opened) == expected
+        assert board.revealed_count == before + len(expected)
+        assert sum(board._revealed) == board.revealed_count
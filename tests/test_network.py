@@ -0,0 +1,120 @@
+import socket
+import struct
+import threading
+
+import pytest
+
+from network import (
+    BINARY, CODECS, COMPRESSED_FLAG, JSON, MAX_CLIENT_FRAME, FrameCompressor, FrameDecompressor, FrameReader,
+    decode_msg, encode_msg,
+)
+
+
+def lobby_state(rows: int, cols: int, revealed: list) -> dict:
+    return {
+        "lobby_id": "abc123", "difficulty": f"Custom {rows}x{cols}/5", "rows": rows, "cols": cols, "mines_total": 5,
+        "flag_count": 1, "safe_remaining": 7, "state": "playing", "game_over": False, "won": False,
+        "elapsed_seconds": 12, "revealed_cells": revealed, "flags": [[0, 1, "p1"]],
+        "players": [{"id": "p1", "nickname": "Ann", "color": "#ef4444", "score": 3, "stunned_seconds": 0.0,
+                     "is_host": True, "connected": True}],
+        "chat": [{"sender": "System", "text": "hi", "timestamp": 1.5}],
+    }
+
+
+def normalized(msg: dict) -> dict:
+    """Cell lists sorted, since the binary codec sends them in board order."""
+    msg = dict(msg)
+    if "cells" in msg:
+        msg["cells"] = sorted(map(list, msg["cells"]))
+    if "lobby" in msg:
+        msg["lobby"] = dict(msg["lobby"], revealed_cells=sorted(map(list, msg["lobby"]["revealed_cells"])))
+    return msg
+
+
+MESSAGES = [
+    {"action": "reveal", "row": 3, "col": 4},
+    {"action": "flag", "row": 0, "col": 65535},
+    {"action": "chord", "row": 999, "col": 0},
+    {"action": "reveal", "row": 70000, "col": 1},
+    {"action": "join", "lobby_id": "abc123", "nickname": "Ann", "codecs": list(CODECS), "compression": ["deflate"]},
+    {"event": "join_success", "player_id": "p1", "codec": BINARY, "compression": None},
+    # Sparse snapshots go out as runs, dense ones as a packed board.
+    {"event": "state_update", "seq": 4, "lobby": lobby_state(3, 4, [[1, 1, 2], [2, 0, 0], [2, 1, 0], [2, 2, 1]])},
+    {"event": "state_update", "seq": 9,
+     "lobby": lobby_state(3, 4, [[r, c, (r + c) % 9] for r in range(3) for c in range(4)][:-1] + [[2, 3, -1]])},
+    {"event": "state_delta", "seq": 5, "flag_count": 1, "safe_remaining": 3, "state": "playing",
+     "game_over": True, "won": False, "elapsed_seconds": 13,
+     "cells": [[0, 2, 8], [0, 3, -1], [0, 0, 0], [0, 1, 1], [5, 7, 3]], "flags": [[0, 1, None]], "chat": []},
+]
+
+
+@pytest.mark.parametrize("codec", CODECS)
+@pytest.mark.parametrize("msg", MESSAGES)
+def test_codec_round_trip(codec, msg):
+    frame = encode_msg(msg, codec)
+    assert struct.unpack(">I", frame[:4])[0] == len(frame) - 4
+    assert normalized(decode_msg(memoryview(frame)[4:])) == normalized(msg)
+
+
+def test_binary_actions_are_compact():
+    assert len(encode_msg({"action": "reveal", "row": 3, "col": 4}, BINARY)) == 4 + 5
+
+
+@pytest.mark.parametrize("payload", [b"", b"\x01\x00", b"{not json", b"\x11\x00\x00\x00\x05", b"\xff\xfe"])
+def test_decode_rejects_garbage(payload):
+    assert decode_msg(payload) is None
+
+
+def test_frame_reader_reassembles_split_and_coalesced_frames():
+    left, right = socket.socketpair()
+    try:
+        frames = b"".join(encode_msg(m, codec) for m in MESSAGES for codec in CODECS)
+        reader = FrameReader(right, size=16)
+
+        def send_in_pieces():
+            for k in range(0, len(frames), 7):
+                left.sendall(frames[k:k + 7])
+            left.close()
+
+        sender = threading.Thread(target=send_in_pieces)
+        sender.start()
+        received = []
+        while (msg := reader.read_msg()) is not None:
+            received.append(normalized(msg))
+        sender.join()
+        assert received == [normalized(m) for m in MESSAGES for _ in CODECS]
+    finally:
+        right.close()
+
+
+def test_frame_reader_drops_oversized_header():
+    left, right = socket.socketpair()
+    try:
+        left.sendall(struct.pack(">I", MAX_CLIENT_FRAME + 1) + b"x" * 16)
+        assert FrameReader(right, max_frame=MAX_CLIENT_FRAME).read_frame() is None
+    finally:
+        left.close()
+        right.close()
+
+
+def test_compressed_frames_round_trip_in_order():
+    compressor = FrameCompressor(threshold=64)
+    inflater = FrameDecompressor()
+    for k in range(5):
+        msg = {"event": "state_update", "seq": k, "lobby": lobby_state(3, 4, [[1, 1, 2]] * (k + 1))}
+        frame = compressor.compress(encode_msg(msg, JSON))
+        header = struct.unpack(">I", frame[:4])[0]
+        assert header & COMPRESSED_FLAG
+        assert header & ~COMPRESSED_FLAG == len(frame) - 4
+        assert decode_msg(inflater.decompress(frame[4:])) == msg
+
+
+def test_small_frames_are_not_compressed():
+    frame = encode_msg({"action": "reveal", "row": 1, "col": 2}, JSON)
+    assert FrameCompressor().compress(frame) == frame
+
+
+def test_decompressor_bounds_inflated_size():
+    frame = FrameCompressor(threshold=0).compress(encode_msg({"chat": " " * (MAX_CLIENT_FRAME * 2)}, JSON))
+    assert FrameDecompressor(MAX_CLIENT_FRAME).decompress(frame[4:]) is None
+    assert FrameDecompressor().decompress(b"not deflate data") is None
@@ -0,0 +1,134 @@
+import random
+
+import pytest
+
+from engine import Difficulty
+from network import CODECS, decode_msg
+from server import Lobby, Player, ScoringRules
+
+SCALARS = ("flag_count", "safe_remaining", "state", "game_over", "won")
+
+
+class NoStun(ScoringRules):
+    stun_seconds = 0.0
+
+
+class CapturingWriter:
+    """Stands in for a ClientWriter and keeps every frame queued to it."""
+
+    def __init__(self, codec: str):
+        self.codec = codec
+        self.closed = False
+        self.frames: list[bytes] = []
+
+    def send(self, frame: bytes, snapshot: bool = False) -> bool:
+        self.frames.append(frame)
+        return True
+
+
+class Mirror:
+    """What a client knows after applying the state messages it received."""
+
+    def __init__(self):
+        self.seq = None
+        self.cells: dict[tuple, int] = {}
+        self.flags: dict[tuple, str] = {}
+        self.players: list = []
+        self.chat: list = []
+        self.scalars: dict = {}
+
+    def apply(self, msg: dict):
+        if msg["event"] == "state_update":
+            lobby = msg["lobby"]
+            self.cells = {(r, c): v for r, c, v in lobby["revealed_cells"]}
+            self.flags = {(r, c): owner for r, c, owner in lobby["flags"]}
+            self.players = lobby["players"]
+            self.chat = list(lobby["chat"])
+            self.scalars = {k: lobby[k] for k in SCALARS}
+        else:
+            assert msg["event"] == "state_delta"
+            assert msg["seq"] == self.seq + 1
+            for r, c, v in msg["cells"]:
+                self.cells[(r, c)] = v
+            for r, c, owner in msg["flags"]:
+                if owner is None:
+                    self.flags.pop((r, c), None)
+                else:
+                    self.flags[(r, c)] = owner
+            if "players" in msg:
+                self.players = msg["players"]
+            self.chat.extend(msg["chat"])
+            self.scalars = {k: msg[k] for k in SCALARS}
+        self.seq = msg["seq"]
+
+    def consume(self, writer: CapturingWriter):
+        for frame in writer.frames:
+            msg = decode_msg(memoryview(frame)[4:])
+            if msg.get("event") in ("state_update", "state_delta"):
+                self.apply(msg)
+        writer.frames.clear()
+
+
+def without_stun(players: list) -> list:
+    return [{k: v for k, v in p.items() if k != "stunned_seconds"} for p in players]
+
+
+def assert_matches_snapshot(mirror: Mirror, lobby: Lobby):
+    expected = lobby.snapshot_message()
+    state = expected["lobby"]
+    assert mirror.seq == expected["seq"]
+    assert mirror.cells == {(r, c): v for r, c, v in state["revealed_cells"]}
+    assert mirror.flags == {(r, c): owner for r, c, owner in state["flags"]}
+    assert without_stun(mirror.players) == without_stun(state["players"])
+    assert mirror.chat[-30:] == state["chat"]
+    assert mirror.scalars == {k: state[k] for k in SCALARS}
+
+
+def join(lobby: Lobby, player_id: str, codec: str) -> tuple[CapturingWriter, Mirror]:
+    """The join sequence of ClientSession.handle."""
+    lobby.players[player_id] = Player(player_id, player_id, "#ef4444", 0, 0.0, not lobby.players, True)
+    lobby.add_chat("System", f"[+] {player_id} joined the game!")
+    lobby.broadcast_state()
+    writer = CapturingWriter(codec)
+    lobby.clients[player_id] = writer
+    lobby.send_snapshot(player_id)
+    return writer, Mirror()
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_delta_stream_reproduces_snapshot(seed):
+    rng = random.Random(seed)
+    random.seed(seed)
+    rows, cols = rng.randint(4, 14), rng.randint(4, 14)
+    lobby = Lobby("t", Difficulty.custom(rows, cols, rng.randint(3, rows * cols // 5)), NoStun())
+    clients = {}
+    for n, codec in enumerate(CODECS):
+        clients[f"p{n}"] = join(lobby, f"p{n}", codec)
+    lobby.state = "playing"
+    lobby.reset_board()
+    lobby.broadcast_state()
+
+    late_joined = False
+    for step in range(150):
+        player_id = rng.choice(sorted(lobby.players))
+        r, c = rng.randrange(rows), rng.randrange(cols)
+        kind = rng.choice(("reveal", "reveal", "flag", "chord", "chat"))
+        if kind == "reveal":
+            lobby.reveal(player_id, r, c)
+        elif kind == "flag":
+            lobby.toggle_flag(player_id, r, c)
+        elif kind == "chord":
+            lobby.chord(player_id, r, c)
+        else:
+            lobby.add_chat(player_id, f"message {step}")
+        lobby.broadcast_state()
+        if lobby.game_over and rng.random() < 0.3:
+            lobby.restart()
+            lobby.broadcast_state()
+        if step == 60 and not late_joined:
+            late_joined = True
+            clients["late"] = join(lobby, "late", rng.choice(CODECS))
+
+        for writer, mirror in clients.values():
+            mirror.consume(writer)
+            assert_matches_snapshot(mirror, lobby)
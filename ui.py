@@ -2,16 +2,79 @@ import math
 import time
 import socket
 import threading
-import json
 import random
-import urllib.request
-import urllib.parse
+from array import array
+from collections import OrderedDict
 import pygame
 
-from engine import Difficulty, MinesweeperEngine, ScoreManager
-from network import UDP_PORT, HTTP_PORT, TCP_PORT, DISCOVER_MSG, OFFER_PREFIX, send_msg, recv_msg
+from engine import MAX_COLS, MAX_ROWS, Difficulty, MinesweeperEngine, ScoreManager, neighbor_deltas, VIEW_MINE, VIEW_HIDDEN, VIEW_FLAG
+from network import UDP_PORT, HTTP_PORT, TCP_PORT, DISCOVER_MSG, OFFER_PREFIX, CODECS, COMPRESSIONS, JSON, send_msg, FrameReader, FrameDecompressor, ApiClient
 import server
 
+# Posted from background threads when they changed something on screen.
+NET_UPDATE = pygame.event.custom_type()
+
+
+class _TextCache:
+    """LRU cache of rendered text surfaces, bounded by their pixel memory.
+
+    Most labels, counters, scoreboard rows and chat lines are identical from
+    frame to frame, so they are rendered once per (font, text, colour,
+    antialias) and blitted from here afterwards.
+    """
+
+    def __init__(self, max_bytes: int = 4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._surfaces: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.render_seconds = 0.0
+
+    def render(self, font: pygame.font.Font, text: str, antialias: bool, color) -> pygame.Surface:
+        key = (font, text, tuple(color), antialias)
+        surf = self._surfaces.get(key)
+        if surf is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surf
+
+        self.misses += 1
+        started = time.perf_counter()
+        surf = font.render(text, antialias, color)
+        self.render_seconds += time.perf_counter() - started
+
+        self._surfaces[key] = surf
+        self.bytes += self._size(surf)
+        while self.bytes > self.max_bytes and len(self._surfaces) > 1:
+            _, old = self._surfaces.popitem(last=False)
+            self.bytes -= self._size(old)
+            self.evictions += 1
+        return surf
+
+    @staticmethod
+    def _size(surf: pygame.Surface) -> int:
+        return surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        return (f"{len(self._surfaces)} surfaces, {self.bytes / 1024:.0f} KiB, "
+                f"hit rate {self.hit_rate:.1%}, {self.misses} renders in {self.render_seconds * 1000:.1f} ms, "
+                f"{self.evictions} evicted")
+
+
+_text_cache = _TextCache()
+
+
+def _render_text(font: pygame.font.Font, text: str, antialias: bool, color) -> pygame.Surface:
+    """Drop-in for font.render() that goes through the shared text cache."""
+    return _text_cache.render(font, text, antialias, color)
+
 
 class _Button:
     def __init__(self, rect: pygame.Rect, text: str, font: pygame.font.Font):
@@ -26,7 +89,7 @@ class _Button:
         pygame.draw.rect(screen, color, self.rect, border_radius=8)
         pygame.draw.rect(screen, pygame.Color(border), self.rect, width=1, border_radius=8)
 
-        surf = self.font.render(self.text, True, pygame.Color(fg))
+        surf = _render_text(self.font, self.text, True, pygame.Color(fg))
         screen.blit(surf, surf.get_rect(center=self.rect.center))
 
     def hit(self, pos):
@@ -106,7 +169,7 @@ class _Overlay:
         pygame.draw.rect(screen, pygame.Color(palette["panel_edge"]), box, width=1, border_radius=14)
 
         y = box.y + 18
-        title_surf = title_font.render(self.title, True, pygame.Color(palette["text"]))
+        title_surf = _render_text(title_font, self.title, True, pygame.Color(palette["text"]))
         screen.blit(title_surf, (box.x + 18, y))
         y += title_surf.get_height() + 14
 
@@ -130,7 +193,7 @@ class _Overlay:
         end = min(len(self.lines), start + self._visible_lines)
         draw_y = content_top
         for line in self.lines[start:end]:
-            surf = text_font.render(line, True, pygame.Color(palette["text"]))
+            surf = _render_text(text_font, line, True, pygame.Color(palette["text"]))
             screen.blit(surf, (content_left, draw_y))
             draw_y += line_h
 
@@ -153,14 +216,223 @@ class _Overlay:
         if is_hover:
             ok_bg = ok_bg.lerp(pygame.Color("#ffffff"), 0.08)
         pygame.draw.rect(screen, ok_bg, ok_rect, border_radius=10)
-        ok_surf = ok_font.render("OK", True, pygame.Color(palette["text"]))
+        ok_surf = _render_text(ok_font, "OK", True, pygame.Color(palette["text"]))
         screen.blit(ok_surf, ok_surf.get_rect(center=ok_rect.center))
 
         return ok_rect
 
 
+# Maps _BoardMirror values, read as unsigned bytes, to engine VIEW_* codes.
+_MIRROR_VIEW_CODES = bytes(range(9)) + bytes(245) + bytes([VIEW_HIDDEN, VIEW_MINE])
+
+
+class _BoardMirror:
+    """Dense client-side copy of a multiplayer board for constant-time lookups.
+
+    Filled from state messages on the network thread; the renderer only reads
+    it. A snapshot builds a fresh mirror that replaces the old one wholesale.
+    """
+    HIDDEN = -2
+    DEFAULT_FLAG_COLOR = "#ef4444"
+
+    def __init__(self, rows: int, cols: int):
+        self.rows = rows
+        self.cols = cols
+        self.values = array("b", [self.HIDDEN]) * (rows * cols)
+        self.flag_owners: list[str | None] = [None] * (rows * cols)
+        self.flagged = bytearray(rows * cols)
+        self.colors: dict[str, str] = {}
+        self.version = 0  # Bumped on every cell or flag change
+
+    def set_cells(self, cells):
+        values, cols = self.values, self.cols
+        for r, c, v in cells:
+            values[r * cols + c] = v
+        self.version += 1
+
+    def set_flags(self, flags):
+        owners, flagged, cols = self.flag_owners, self.flagged, self.cols
+        for r, c, pid in flags:
+            owners[r * cols + c] = pid
+            flagged[r * cols + c] = 1 if pid else 0
+        self.version += 1
+
+    def view_codes(self) -> bytes:
+        """Same per-cell codes as engine.Board.view_codes()."""
+        codes = self.values.tobytes().translate(_MIRROR_VIEW_CODES)
+        size = len(codes)
+        return (int.from_bytes(codes, "big") | int.from_bytes(self.flagged, "big")).to_bytes(size, "big")
+
+    def set_players(self, players):
+        self.colors = {p["id"]: p["color"] for p in players}
+
+    def value(self, r: int, c: int) -> int | None:
+        """Revealed value (-1 for a mine) or None while the cell is hidden."""
+        v = self.values[r * self.cols + c]
+        return None if v == self.HIDDEN else v
+
+    def flag_owner(self, r: int, c: int) -> str | None:
+        return self.flag_owners[r * self.cols + c]
+
+    def flag_color(self, pid: str) -> str:
+        return self.colors.get(pid, self.DEFAULT_FLAG_COLOR)
+
+
+class _BoardRenderer:
+    """Retained view of the visible part of the board, redrawn only where it changed.
+
+    Every tile state has a hashable key (see MinesweeperPygameApp._tile_key);
+    each key is rendered once at the base tile size, scaled once per zoom
+    level and blitted from that atlas. update() compares the keys of the
+    visible tiles against what the surface already shows and reports the
+    rectangles it had to repaint. Below OVERVIEW_TILE pixels per cell numbers
+    are unreadable anyway, so update_overview() scales a one-pixel-per-cell
+    image of the board instead.
+    """
+    FULL_UPDATE_TILES = 64
+    OVERVIEW_TILE = 12
+
+    def __init__(self, base_tile: int, render_tile, background: str):
+        self.base_tile = base_tile
+        self._render_tile = render_tile
+        self._background = pygame.Color(background)
+        self._atlas: dict = {}
+        self.surface: pygame.Surface | None = None
+        self._view = None
+        self._keys: list = []
+        self._overview: pygame.Surface | None = None
+        self._overview_pixels = None
+        self._overview_version = None
+
+    def tile_surface(self, key, tile: int) -> pygame.Surface:
+        surf = self._atlas.get((tile, key))
+        if surf is None:
+            surf = self._atlas.get((self.base_tile, key))
+            if surf is None:
+                surf = self._atlas[(self.base_tile, key)] = self._render_tile(key)
+            if tile != self.base_tile:
+                surf = self._atlas[(tile, key)] = pygame.transform.smoothscale(surf, (tile, tile))
+        return surf
+
+    @staticmethod
+    def visible_cells(view) -> tuple[int, int, int, int]:
+        """First and past-the-end row and column intersecting the viewport."""
+        tile, cam_x, cam_y, w, h, rows, cols = view
+        return (int(cam_y // tile), min(rows, int((cam_y + h) // tile) + 1),
+                int(cam_x // tile), min(cols, int((cam_x + w) // tile) + 1))
+
+    def _set_view(self, view) -> bool:
+        if view == self._view:
+            return False
+        size = (view[3], view[4])
+        if self.surface is None or self.surface.get_size() != size:
+            self.surface = pygame.Surface(size)
+        self.surface.fill(self._background)
+        self._view = view
+        self._keys = []
+        return True
+
+    def _scroll(self, view) -> bool:
+        """Follows a pan by scrolling the surface; only newly exposed tiles stay unknown."""
+        old = self._view
+        if not self._keys or old[0] != view[0] or old[3:] != view[3:]:
+            return False
+        dx, dy = view[1] - old[1], view[2] - old[2]
+        if abs(dx) >= view[3] or abs(dy) >= view[4]:
+            return False
+        self.surface.scroll(-dx, -dy)
+
+        # Carry over the keys of tiles that were fully on screen before; the
+        # edge rows and columns of the old view may have been clipped.
+        or0, or1, oc0, oc1 = self.visible_cells(old)
+        nr0, nr1, nc0, nc1 = self.visible_cells(view)
+        old_w, new_w = oc1 - oc0, nc1 - nc0
+        keys = [None] * ((nr1 - nr0) * new_w)
+        cs, ce = max(nc0, oc0 + 1), min(nc1, oc1 - 1)
+        for r in range(max(nr0, or0 + 1), min(nr1, or1 - 1)):
+            if ce > cs:
+                src = (r - or0) * old_w + (cs - oc0)
+                dst = (r - nr0) * new_w + (cs - nc0)
+                keys[dst:dst + ce - cs] = self._keys[src:src + ce - cs]
+        self._keys = keys
+        self._view = view
+        return True
+
+    def update(self, tile_key, view) -> list[pygame.Rect]:
+        """Repaints changed visible tiles; returns their rectangles in viewport coordinates.
+
+        view is (tile, cam_x, cam_y, width, height, rows, cols), the camera
+        offset being in pixels of the zoomed board.
+        """
+        moved = False
+        if view != self._view:
+            moved = (self._view is not None and self._scroll(view)) or self._set_view(view)
+        t, cam_x, cam_y = view[0], view[1], view[2]
+        r0, r1, c0, c1 = self.visible_cells(view)
+        if not self._keys:
+            self._keys = [None] * ((r1 - r0) * (c1 - c0))
+        keys = self._keys
+        blit = self.surface.blit
+        dirty = []
+        slot = 0
+        for r in range(r0, r1):
+            y = r * t - cam_y
+            for c in range(c0, c1):
+                key = tile_key(r, c)
+                if keys[slot] != key:
+                    keys[slot] = key
+                    x = c * t - cam_x
+                    blit(self.tile_surface(key, t), (x, y))
+                    dirty.append(pygame.Rect(x, y, t, t))
+                slot += 1
+        if moved or len(dirty) > self.FULL_UPDATE_TILES:
+            return [self.surface.get_rect()]
+        return dirty
+
+    def update_overview(self, make_pixels, version, view) -> bool:
+        """Redraws the downsampled board when it or the camera changed; returns True if it did.
+
+        make_pixels() returns the board as packed RGB bytes, one pixel per cell.
+        """
+        rebuilt = version != self._overview_version
+        if rebuilt:
+            self._overview_pixels = make_pixels()
+            self._overview = pygame.image.frombuffer(self._overview_pixels, (view[6], view[5]), "RGB")
+            self._overview_version = version
+        if not self._set_view(view) and not rebuilt:
+            return False
+        if rebuilt:
+            self.surface.fill(self._background)
+        t, cam_x, cam_y = view[0], view[1], view[2]
+        r0, r1, c0, c1 = self.visible_cells(view)
+        part = self._overview.subsurface(pygame.Rect(c0, r0, c1 - c0, r1 - r0))
+        scaled = pygame.transform.scale(part, (round((c1 - c0) * t), round((r1 - r0) * t)))
+        self.surface.blit(scaled, (round(c0 * t - cam_x), round(r0 * t - cam_y)))
+        self._keys = []
+        return True
+
+
+def _apply_lobby_changes(lobbies: list[dict], changes: list[dict]) -> list[dict]:
+    """Returns a new lobby list with changed entries replaced, new ones appended and deleted ones dropped."""
+    updated = {c["lobby_id"]: c["lobby"] for c in changes}
+    result = []
+    for lobby in lobbies:
+        lobby_id = lobby["lobby_id"]
+        if lobby_id in updated:
+            lobby = updated.pop(lobby_id)
+            if lobby is None:
+                continue
+        result.append(lobby)
+    result.extend(lobby for lobby in updated.values() if lobby is not None)
+    return result
+
+
 class MinesweeperPygameApp:
-    def __init__(self):
+    ZOOM_LEVELS = (0.25, 0.5, 1, 2, 4, 8, 12, 16, 20, 26, 32, 40)
+    MAX_VIEW = (1200, 720)
+    LOBBY_POLL_SECONDS = 25
+
+    def __init__(self, custom: Difficulty | None = None, debug: bool = False):
         pygame.init()
         pygame.display.set_caption("Minesweeper Multiplayer")
 
@@ -188,25 +460,46 @@ class MinesweeperPygameApp:
             Difficulty("Medium", 16, 16, 40),
             Difficulty("Hard", 16, 30, 99),
         ]
+        if custom is not None:
+            self.difficulties.append(custom)
+        self.custom_difficulty = custom
+        self.debug = debug
         self.difficulty_index = 0
 
         self.tile = 26
         self.pad = 10
         self.panel_h = 64
 
+        # Board camera: zoomed tile size in pixels and the offset of the
+        # viewport into the zoomed board. Boards larger than MAX_VIEW scroll.
+        self._zoom = self.tile
+        self._cam_x = 0
+        self._cam_y = 0
+        self._camera_board = None
+
         self.app_state = "menu"
         self.nickname = f"Player{random.randint(100, 999)}"
         self.editing_nick = False
         
         self.discovered_servers = []
         self.selected_server = None  # {ip, name, tcp_port, http_port}
+        self._api_clients: dict[tuple[str, int], ApiClient] = {}
         self.manual_ip = "127.0.0.1"
         self.editing_ip = False
         
         self.discovered_lobbies = []
+        self._lobbies_etag = None
+        self._watched_server = None
         self.tcp_sock = None
         self.tcp_connected = False
-        self.lobby_state = None  # Receives full dict update from server
+        self.lobby_state = None  # Lobby fields from the last snapshot, patched by state deltas
+        self.mirror: _BoardMirror | None = None  # Revealed cells and flags of that lobby
+        self._lobby_seq = 0
+        self._awaiting_resync = False
+        self._codec = JSON
+        self._state_received = 0.0  # time.monotonic() of the last applied state message
+        self._players_received = 0.0
+        self._net_update_pending = False
         self.player_id = None
         self.chat_input = ""
         self.editing_chat = False
@@ -226,6 +519,12 @@ class MinesweeperPygameApp:
         self._mine_rect_cache: pygame.Rect | None = None
         self._timer_rect_cache: pygame.Rect | None = None
 
+        self._board_renderer = _BoardRenderer(self.tile, self._render_tile, self.palette["bg"])
+        self._overview_palette = self._build_overview_palette()
+        self._full_redraw = True
+        self._rendered_view = None
+        self._stun_shown = False
+
         self.clock = pygame.time.Clock()
 
         # Fonts
@@ -248,7 +547,7 @@ class MinesweeperPygameApp:
         x = panel_x
         for d in self.difficulties:
             rect = pygame.Rect(x, panel_y + 14, 110, btn_h)
-            self.diff_buttons.append(_Button(rect, d.name, self.font_ui))
+            self.diff_buttons.append(_Button(rect, "Custom" if d.is_custom else d.name, self.font_ui))
             x += rect.width + 10
 
         self.highscores_btn = _Button(pygame.Rect(x, panel_y + 14, 130, btn_h), "Highscores", self.font_ui)
@@ -295,13 +594,30 @@ class MinesweeperPygameApp:
         self._smiley_rect_cache = smiley_rect
         self._timer_rect_cache = timer_rect
 
+    def _board_dims(self) -> tuple[int, int] | None:
+        if self.app_state == "playing_sp":
+            if self.engine is None:
+                return None
+            return self.engine.rows, self.engine.cols
+        if self.lobby_state is None:
+            return None
+        return self.lobby_state["rows"], self.lobby_state["cols"]
+
+    def _view_size(self) -> tuple[int, int]:
+        """Board viewport size: the whole board at the default tile size, up to MAX_VIEW."""
+        dims = self._board_dims()
+        if dims is None:
+            return 0, 0
+        rows, cols = dims
+        return min(cols * self.tile, self.MAX_VIEW[0]), min(rows * self.tile, self.MAX_VIEW[1])
+
     def _board_origin(self):
         if self.app_state == "playing_sp":
             if self.engine is None:
                 return self.pad, self.panel_h + self.pad
             w, _ = self.screen.get_size()
-            board_w = self.engine.cols * self.tile
-            x = max(self.pad, (w - board_w) // 2)
+            view_w, _ = self._view_size()
+            x = max(self.pad, (w - view_w) // 2)
             return x, self.panel_h + self.pad
         else:
             # Multiplayer
@@ -309,11 +625,15 @@ class MinesweeperPygameApp:
                 return self.pad, self.panel_h + self.pad
             return self.pad, self.panel_h + self.pad
 
+    def _board_view_rect(self) -> pygame.Rect:
+        return pygame.Rect(self._board_origin(), self._view_size())
+
     def _window_size_for_engine(self):
         if self.engine is None:
             return 640, 480
-        board_w = self.engine.cols * self.tile + 2 * self.pad
-        board_h = self.panel_h + self.engine.rows * self.tile + 2 * self.pad
+        view_w, view_h = self._view_size()
+        board_w = view_w + 2 * self.pad
+        board_h = self.panel_h + view_h + 2 * self.pad
         min_w = 760
         min_h = 480
         return max(min_w, board_w), max(min_h, board_h)
@@ -321,13 +641,84 @@ class MinesweeperPygameApp:
     def _window_size_for_mp(self):
         if self.lobby_state is None:
             return 800, 500
-        board_w = self.lobby_state["cols"] * self.tile
-        board_h = self.lobby_state["rows"] * self.tile
+        board_w, board_h = self._view_size()
         # 320px for sidebar, plus padding
         width = max(800, board_w + 360)
         height = max(520, self.panel_h + board_h + 30)
         return width, height
 
+    def _sync_camera(self):
+        """Resets the camera when a different board is shown, and keeps it inside the board."""
+        dims = self._board_dims()
+        if self.app_state == "playing_sp":
+            board = (id(self.engine), dims)
+        else:
+            board = (self.lobby_state["lobby_id"] if self.lobby_state else None, dims)
+        if board != self._camera_board:
+            self._camera_board = board
+            self._zoom = self.tile
+            self._cam_x = self._cam_y = 0
+        if dims is None:
+            return
+        rows, cols = dims
+        view_w, view_h = self._view_size()
+        self._cam_x = max(0, min(self._cam_x, math.ceil(cols * self._zoom) - view_w))
+        self._cam_y = max(0, min(self._cam_y, math.ceil(rows * self._zoom) - view_h))
+
+    def _pan(self, dx: int, dy: int):
+        self._cam_x += dx
+        self._cam_y += dy
+        self._sync_camera()
+
+    def _zoom_step(self, steps: int, anchor=None):
+        """Zooms in (steps > 0) or out, keeping the board point under anchor in place."""
+        levels = self.ZOOM_LEVELS
+        current = min(range(len(levels)), key=lambda k: abs(levels[k] - self._zoom))
+        zoom = levels[max(0, min(len(levels) - 1, current + steps))]
+        if zoom == self._zoom:
+            return
+        view = self._board_view_rect()
+        if anchor is None or not view.collidepoint(anchor):
+            anchor = view.center
+        ax, ay = anchor[0] - view.x, anchor[1] - view.y
+        self._cam_x = int((self._cam_x + ax) * zoom / self._zoom - ax)
+        self._cam_y = int((self._cam_y + ay) * zoom / self._zoom - ay)
+        self._zoom = zoom
+        self._sync_camera()
+
+    def _handle_view_event(self, e: pygame.event.Event) -> bool:
+        """Wheel zoom, arrow-key panning and Home to reset; returns True if consumed."""
+        if self._board_dims() is None:
+            return False
+        if e.type == pygame.MOUSEWHEEL:
+            if e.y:
+                self._zoom_step(1 if e.y > 0 else -1, pygame.mouse.get_pos())
+            if e.x:
+                self._pan(e.x * 40, 0)
+            self._hover_cell = self._cell_from_pos(pygame.mouse.get_pos())
+            return True
+        if e.type == pygame.KEYDOWN:
+            view_w, view_h = self._view_size()
+            moves = {
+                pygame.K_LEFT: (-view_w // 4, 0),
+                pygame.K_RIGHT: (view_w // 4, 0),
+                pygame.K_UP: (0, -view_h // 4),
+                pygame.K_DOWN: (0, view_h // 4),
+            }
+            if e.key in moves:
+                self._pan(*moves[e.key])
+            elif e.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                self._zoom_step(1)
+            elif e.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                self._zoom_step(-1)
+            elif e.key == pygame.K_HOME:
+                self._camera_board = None
+                self._sync_camera()
+            else:
+                return False
+            return True
+        return False
+
     def new_game(self, difficulty: Difficulty):
         self.app_state = "playing_sp"
         self.engine = MinesweeperEngine(difficulty.rows, difficulty.cols, difficulty.mines)
@@ -344,6 +735,7 @@ class MinesweeperPygameApp:
         self._timer_rect_cache = None
 
         self.screen = pygame.display.set_mode(self._window_size_for_engine())
+        self._full_redraw = True
 
     def _elapsed_seconds(self) -> int:
         if self.app_state == "playing_sp":
@@ -353,7 +745,45 @@ class MinesweeperPygameApp:
         else:
             if self.lobby_state is None:
                 return 0
-            return self.lobby_state.get("elapsed_seconds", 0)
+            elapsed = self.lobby_state.get("elapsed_seconds", 0)
+            if self._mp_clock_running():
+                elapsed += int(time.monotonic() - self._state_received)
+            return min(999, elapsed)
+
+    def _mp_clock_running(self) -> bool:
+        state = self.lobby_state
+        return state is not None and state["state"] == "playing" and not state["game_over"]
+
+    def _stun_left(self, player: dict) -> float:
+        """Seconds of stun left, counted down locally since the player list arrived."""
+        return max(0.0, player["stunned_seconds"] - (time.monotonic() - self._players_received))
+
+    def _next_wakeup_ms(self) -> int | None:
+        """Time until a visible countdown (timer, stun) next changes, or None if nothing runs."""
+        waits = []
+        if self.app_state == "playing_sp":
+            if self.engine is not None and self._start_time is not None and not self.engine.game_over:
+                waits.append(1.0 - (time.time() - self._start_time) % 1.0)
+        elif self.app_state == "playing_mp" and self.lobby_state is not None:
+            if self._mp_clock_running():
+                waits.append(1.0 - (time.monotonic() - self._state_received) % 1.0)
+            for p in self.lobby_state["players"]:
+                left = self._stun_left(p)
+                if left > 0:
+                    waits.append(left % 1.0 or 1.0)
+        if not waits:
+            return None
+        return int(min(waits) * 1000) + 1
+
+    def _notify_redraw(self):
+        """Wakes the main loop from another thread; repeated calls coalesce."""
+        if self._net_update_pending:
+            return
+        self._net_update_pending = True
+        try:
+            pygame.event.post(pygame.event.Event(NET_UPDATE))
+        except pygame.error:
+            self._net_update_pending = False
 
     def _ensure_timer_started(self):
         if self._start_time is None:
@@ -363,32 +793,28 @@ class MinesweeperPygameApp:
         if self.app_state == "playing_sp":
             if self.engine is None:
                 return "000"
-            left = self.engine.mines_total - len(self.engine.flags)
+            left = self.engine.mines_total - self.engine.flag_count
         else:
             if self.lobby_state is None:
                 return "000"
-            left = self.lobby_state["mines_total"] - len(self.lobby_state["flags"])
+            left = self.lobby_state["mines_total"] - self.lobby_state["flag_count"]
 
         left = max(-99, min(999, left))
         sign = "-" if left < 0 else ""
         return f"{sign}{abs(left):03d}"[-3:]
 
     def _cell_from_pos(self, pos):
-        ox, oy = self._board_origin()
-        x, y = pos
-        x -= ox
-        y -= oy
-        if x < 0 or y < 0:
+        """Maps a screen position through the board camera to a cell, or None."""
+        view = self._board_view_rect()
+        if not view.collidepoint(pos):
             return None
-        c = x // self.tile
-        r = y // self.tile
-        
-        if self.app_state == "playing_sp" and self.engine:
-            if 0 <= r < self.engine.rows and 0 <= c < self.engine.cols:
-                return int(r), int(c)
-        elif self.app_state == "playing_mp" and self.lobby_state:
-            if 0 <= r < self.lobby_state["rows"] and 0 <= c < self.lobby_state["cols"]:
-                return int(r), int(c)
+        dims = self._board_dims()
+        if dims is None:
+            return None
+        c = int((pos[0] - view.x + self._cam_x) // self._zoom)
+        r = int((pos[1] - view.y + self._cam_y) // self._zoom)
+        if 0 <= r < dims[0] and 0 <= c < dims[1]:
+            return r, c
         return None
 
     def _num_color(self, n: int) -> str:
@@ -468,46 +894,103 @@ class MinesweeperPygameApp:
                 except Exception:
                     break
             self.discovered_servers = servers
+            self._notify_redraw()
 
         t = threading.Thread(target=run_discover, daemon=True)
         t.start()
 
+    def _api(self) -> ApiClient:
+        """The pooled REST connection to the selected server, opened on first use."""
+        key = (self.selected_server["ip"], self.selected_server["http_port"])
+        client = self._api_clients.get(key)
+        if client is None:
+            client = self._api_clients[key] = ApiClient(*key)
+        return client
+
     def fetch_lobbies_via_http(self):
         if not self.selected_server:
             return
-        ip = self.selected_server["ip"]
-        port = self.selected_server["http_port"]
-        url = f"http://{ip}:{port}/api/lobbies"
+        self._watch_lobbies()
+        api = self._api()
         
         def run_fetch():
+            # The listing is only sent again when it changed; on 304 the
+            # lobbies shown are still current.
+            headers = {"If-None-Match": self._lobbies_etag} if self._lobbies_etag else None
             try:
-                with urllib.request.urlopen(url, timeout=1.0) as resp:
-                    if resp.status == 200:
-                        self.discovered_lobbies = json.loads(resp.read().decode("utf-8"))
+                status, resp_headers, lobbies = api.request("GET", "/api/lobbies", headers=headers)
+                if status == 200:
+                    self.discovered_lobbies = lobbies
+                    self._lobbies_etag = resp_headers.get("ETag")
             except Exception as e:
                 print(f"Failed to fetch lobbies: {e}")
                 self.discovered_lobbies = []
+                self._lobbies_etag = None
+            self._notify_redraw()
 
         t = threading.Thread(target=run_fetch, daemon=True)
         t.start()
 
-    def create_lobby_via_http(self, difficulty_name):
+    def _watch_lobbies(self):
+        """Keeps discovered_lobbies current through the server's long-poll endpoint.
+
+        One watcher runs per selected server, on its own connection so that a
+        held poll never delays other requests, and stops once another server
+        is selected.
+        """
+        server_info = self.selected_server
+        if server_info is None or self._watched_server is server_info:
+            return
+        self._watched_server = server_info
+        api = ApiClient(server_info["ip"], server_info["http_port"], timeout=self.LOBBY_POLL_SECONDS + 5)
+
+        def run_watch():
+            cursor = None
+            while self.selected_server is server_info:
+                query = f"?timeout={self.LOBBY_POLL_SECONDS}" + (f"&since={cursor}" if cursor else "")
+                try:
+                    status, _, update = api.request("GET", "/api/lobbies/updates" + query)
+                except Exception as e:
+                    print(f"Lobby updates failed: {e}")
+                    cursor = None
+                    time.sleep(2.0)
+                    continue
+                if status != 200:
+                    # A server without the endpoint: the Refresh button still works.
+                    break
+                if self.selected_server is not server_info:
+                    break
+                cursor = update["cursor"]
+                if update["reset"]:
+                    self.discovered_lobbies = update["lobbies"]
+                elif update["changes"]:
+                    self.discovered_lobbies = _apply_lobby_changes(self.discovered_lobbies, update["changes"])
+                else:
+                    continue
+                self._notify_redraw()
+            api.close()
+            if self._watched_server is server_info:
+                self._watched_server = None
+
+        threading.Thread(target=run_watch, daemon=True).start()
+
+    def create_lobby_via_http(self, difficulty: Difficulty):
         if not self.selected_server:
             return
-        ip = self.selected_server["ip"]
-        port = self.selected_server["http_port"]
-        url = f"http://{ip}:{port}/api/lobbies"
         
-        data = json.dumps({"difficulty": difficulty_name}).encode("utf-8")
-        req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"}, method="POST")
+        if difficulty.is_custom:
+            body = {"rows": difficulty.rows, "cols": difficulty.cols, "mines": difficulty.mines}
+        else:
+            body = {"difficulty": difficulty.name}
         
         try:
-            with urllib.request.urlopen(req, timeout=1.5) as resp:
-                if resp.status in (200, 201):
-                    res = json.loads(resp.read().decode("utf-8"))
-                    lobby_id = res.get("lobby_id")
-                    if lobby_id:
-                        self.join_lobby_via_tcp(lobby_id)
+            status, _, res = self._api().request("POST", "/api/lobbies", body)
+            if status in (200, 201):
+                lobby_id = res.get("lobby_id")
+                if lobby_id:
+                    self.join_lobby_via_tcp(lobby_id)
+            else:
+                print(f"Failed to create lobby: {res.get('error') if res else status}")
         except Exception as e:
             print(f"Failed to create lobby: {e}")
 
@@ -524,11 +1007,14 @@ class MinesweeperPygameApp:
             self.tcp_sock.connect((ip, port))
             self.tcp_sock.settimeout(None)
             self.tcp_connected = True
+            self._codec = JSON
             
             send_msg(self.tcp_sock, {
                 "action": "join",
                 "lobby_id": lobby_id,
-                "nickname": self.nickname
+                "nickname": self.nickname,
+                "codecs": list(CODECS),
+                "compression": list(COMPRESSIONS)
             })
             
             t = threading.Thread(target=self._tcp_recv_loop, daemon=True)
@@ -541,22 +1027,66 @@ class MinesweeperPygameApp:
             self._show_message("Error", "Could not connect to lobby.")
 
     def _tcp_recv_loop(self):
+        # Compression is offered in the join, so the server may use it from
+        # the first frame on.
+        reader = FrameReader(self.tcp_sock, inflater=FrameDecompressor())
         while self.tcp_connected:
             try:
-                msg = recv_msg(self.tcp_sock)
+                msg = reader.read_msg()
                 if not msg:
                     break
                 event = msg.get("event")
                 if event == "join_success":
                     self.player_id = msg.get("player_id")
+                    self._codec = msg.get("codec", JSON)
                 elif event == "state_update":
-                    self.lobby_state = msg.get("lobby")
+                    self._apply_snapshot(msg)
+                    self._notify_redraw()
+                elif event == "state_delta":
+                    self._apply_delta(msg)
+                    self._notify_redraw()
             except Exception as e:
                 print(f"TCP connection lost: {e}")
                 break
         
         self.disconnect_tcp()
 
+    def _apply_snapshot(self, msg: dict):
+        state = msg.get("lobby")
+        mirror = _BoardMirror(state["rows"], state["cols"])
+        mirror.set_cells(state.pop("revealed_cells"))
+        mirror.set_flags(state.pop("flags"))
+        mirror.set_players(state["players"])
+        self._lobby_seq = msg.get("seq", 0)
+        self._awaiting_resync = False
+        self._state_received = self._players_received = time.monotonic()
+        self.mirror = mirror
+        self.lobby_state = state
+
+    def _apply_delta(self, msg: dict):
+        """Applies a state_delta to the local lobby mirror, or asks for a resync on a gap."""
+        if self.lobby_state is None or self._awaiting_resync:
+            return
+        if msg["seq"] != self._lobby_seq + 1:
+            self._awaiting_resync = True
+            send_msg(self.tcp_sock, {"action": "resync"})
+            return
+        self._lobby_seq = msg["seq"]
+
+        state = self.lobby_state
+        self.mirror.set_cells(msg["cells"])
+        self.mirror.set_flags(msg["flags"])
+        if msg["chat"]:
+            state["chat"] = (state["chat"] + msg["chat"])[-30:]
+        now = time.monotonic()
+        if "players" in msg:
+            state["players"] = msg["players"]
+            self._players_received = now
+            self.mirror.set_players(msg["players"])
+        for key in ("flag_count", "safe_remaining", "state", "game_over", "won", "elapsed_seconds"):
+            state[key] = msg[key]
+        self._state_received = now
+
     def disconnect_tcp(self):
         self.tcp_connected = False
         if self.tcp_sock:
@@ -567,11 +1097,13 @@ class MinesweeperPygameApp:
                 pass
             self.tcp_sock = None
         self.lobby_state = None
+        self.mirror = None
         self.player_id = None
         
         if self.app_state in ("playing_mp",):
             self.app_state = "lobby_room"
             pygame.display.set_mode((640, 480))
+        self._notify_redraw()
 
     def host_local_server(self):
         def run_srv():
@@ -613,7 +1145,7 @@ class MinesweeperPygameApp:
             
             # Check if local player is stunned
             me = next((p for p in self.lobby_state["players"] if p["id"] == self.player_id), None)
-            if me and me["stunned_seconds"] > 0:
+            if me and self._stun_left(me) > 0:
                 return
 
             self._mouse_down[button] = True
@@ -629,15 +1161,10 @@ class MinesweeperPygameApp:
                 self._pressed_cells = {(r, c)}
 
     def get_neighbors_mp(self, r: int, c: int):
-        rows = self.lobby_state["rows"]
         cols = self.lobby_state["cols"]
-        for dr in (-1, 0, 1):
-            for dc in (-1, 0, 1):
-                if dr == 0 and dc == 0:
-                    continue
-                nr, nc = r + dr, c + dc
-                if 0 <= nr < rows and 0 <= nc < cols:
-                    yield nr, nc
+        i = r * cols + c
+        for d in neighbor_deltas(self.lobby_state["rows"], cols)[i]:
+            yield divmod(i + d, cols)
 
     def _handle_board_mouse_up(self, button: int, pos):
         if self.app_state == "playing_sp":
@@ -671,14 +1198,16 @@ class MinesweeperPygameApp:
                     self._show_message("Minesweeper", "Boom! You hit a mine.")
                 elif action.get("type") == "win":
                     elapsed = self._elapsed_seconds()
-                    diff_name = self.difficulties[self.difficulty_index].name
+                    diff = self.difficulties[self.difficulty_index]
                     for d in self.difficulties:
                         if d.rows == self.engine.rows and d.cols == self.engine.cols and d.mines == self.engine.mines_total:
-                            diff_name = d.name
+                            diff = d
                             break
-                    ScoreManager.add_score(diff_name, elapsed)
+                    # Highscores are kept per preset only, as on the server.
+                    if not diff.is_custom:
+                        ScoreManager.add_score(diff.name, elapsed)
 
-                    self.engine.flags = set(self.engine.mines)
+                    self.engine.flag_all_mines()
                     self._smiley_state = "win"
                     self._show_message("Minesweeper", "You win!")
         else:
@@ -687,7 +1216,7 @@ class MinesweeperPygameApp:
             
             # Check if local player is stunned
             me = next((p for p in self.lobby_state["players"] if p["id"] == self.player_id), None)
-            if me and me["stunned_seconds"] > 0:
+            if me and self._stun_left(me) > 0:
                 self._pressed_cells = set()
                 self._mouse_down[button] = False
                 return
@@ -705,12 +1234,12 @@ class MinesweeperPygameApp:
             if cell is not None and not self.lobby_state["game_over"]:
                 r, c = cell
                 if button == 3:
-                    send_msg(self.tcp_sock, {"action": "flag", "row": r, "col": c})
+                    send_msg(self.tcp_sock, {"action": "flag", "row": r, "col": c}, self._codec)
                 else:
                     if chord_intent:
-                        send_msg(self.tcp_sock, {"action": "chord", "row": r, "col": c})
+                        send_msg(self.tcp_sock, {"action": "chord", "row": r, "col": c}, self._codec)
                     else:
-                        send_msg(self.tcp_sock, {"action": "reveal", "row": r, "col": c})
+                        send_msg(self.tcp_sock, {"action": "reveal", "row": r, "col": c}, self._codec)
 
             self._pressed_cells = set()
 
@@ -718,13 +1247,13 @@ class MinesweeperPygameApp:
         self.screen.fill(pygame.Color(self.palette["bg"]))
         w, h = self.screen.get_size()
         
-        title = self.font_title_large.render("MINESWEEPER", True, pygame.Color(self.palette["text"]))
+        title = _render_text(self.font_title_large, "MINESWEEPER", True, pygame.Color(self.palette["text"]))
         self.screen.blit(title, title.get_rect(center=(w // 2, 80)))
         
-        sub = self.font_ui.render("Multiplayer Cooperative & Competitive", True, pygame.Color(self.palette["subtext"]))
+        sub = _render_text(self.font_ui, "Multiplayer Cooperative & Competitive", True, pygame.Color(self.palette["subtext"]))
         self.screen.blit(sub, sub.get_rect(center=(w // 2, 120)))
         
-        nick_lbl = self.font_ui.render("Your Nickname (click to edit):", True, pygame.Color(self.palette["subtext"]))
+        nick_lbl = _render_text(self.font_ui, "Your Nickname (click to edit):", True, pygame.Color(self.palette["subtext"]))
         self.screen.blit(nick_lbl, (w // 2 - 130, 160))
         
         nick_box = pygame.Rect(w // 2 - 130, 185, 260, 36)
@@ -733,7 +1262,7 @@ class MinesweeperPygameApp:
         pygame.draw.rect(self.screen, pygame.Color(box_bg), nick_box, border_radius=8)
         pygame.draw.rect(self.screen, pygame.Color(border_color), nick_box, width=2, border_radius=8)
         
-        nick_txt = self.font_ui.render(self.nickname, True, pygame.Color(self.palette["text"]))
+        nick_txt = _render_text(self.font_ui, self.nickname, True, pygame.Color(self.palette["text"]))
         self.screen.blit(nick_txt, nick_txt.get_rect(center=nick_box.center))
         
         mouse = pygame.mouse.get_pos()
@@ -752,10 +1281,10 @@ class MinesweeperPygameApp:
         self.screen.fill(pygame.Color(self.palette["bg"]))
         w, h = self.screen.get_size()
         
-        title = self.font_title.render("LAN Server Browser", True, pygame.Color(self.palette["text"]))
+        title = _render_text(self.font_title, "LAN Server Browser", True, pygame.Color(self.palette["text"]))
         self.screen.blit(title, (30, 30))
         
-        sub = self.font_ui.render("Searching for servers via UDP Broadcast...", True, pygame.Color(self.palette["subtext"]))
+        sub = _render_text(self.font_ui, "Searching for servers via UDP Broadcast...", True, pygame.Color(self.palette["subtext"]))
         self.screen.blit(sub, (30, 60))
         
         # List discovered servers
@@ -764,7 +1293,7 @@ class MinesweeperPygameApp:
         pygame.draw.rect(self.screen, pygame.Color(self.palette["panel_edge"]), list_rect, width=1, border_radius=10)
         
         if not self.discovered_servers:
-            empty_txt = self.font_ui.render("No local servers found. Click Refresh.", True, pygame.Color(self.palette["subtext"]))
+            empty_txt = _render_text(self.font_ui, "No local servers found. Click Refresh.", True, pygame.Color(self.palette["subtext"]))
             self.screen.blit(empty_txt, empty_txt.get_rect(center=list_rect.center))
         else:
             y_offset = list_rect.y + 10
@@ -774,8 +1303,8 @@ class MinesweeperPygameApp:
                 bg = self.palette["tile_hidden_hover"] if srv_rect.collidepoint(mouse) else self.palette["panel_edge"]
                 pygame.draw.rect(self.screen, pygame.Color(bg), srv_rect, border_radius=6)
                 
-                srv_name = self.font_ui.render(s["name"], True, pygame.Color(self.palette["text"]))
-                srv_ip = self.font_chat.render(f"{s['ip']}:{s['tcp_port']}", True, pygame.Color(self.palette["subtext"]))
+                srv_name = _render_text(self.font_ui, s["name"], True, pygame.Color(self.palette["text"]))
+                srv_ip = _render_text(self.font_chat, f"{s['ip']}:{s['tcp_port']}", True, pygame.Color(self.palette["subtext"]))
                 
                 self.screen.blit(srv_name, (srv_rect.x + 10, srv_rect.y + 6))
                 self.screen.blit(srv_ip, (srv_rect.x + 10, srv_rect.y + 24))
@@ -785,7 +1314,7 @@ class MinesweeperPygameApp:
                     break  # Simple limit to avoid overflow
 
         # Right control panel (manual IP)
-        lbl_manual = self.font_ui.render("Connect to IP manually:", True, pygame.Color(self.palette["subtext"]))
+        lbl_manual = _render_text(self.font_ui, "Connect to IP manually:", True, pygame.Color(self.palette["subtext"]))
         self.screen.blit(lbl_manual, (410, 95))
         
         ip_box = pygame.Rect(410, 120, 200, 36)
@@ -794,7 +1323,7 @@ class MinesweeperPygameApp:
         pygame.draw.rect(self.screen, pygame.Color(box_bg), ip_box, border_radius=8)
         pygame.draw.rect(self.screen, pygame.Color(border_color), ip_box, width=2, border_radius=8)
         
-        ip_txt = self.font_ui.render(self.manual_ip, True, pygame.Color(self.palette["text"]))
+        ip_txt = _render_text(self.font_ui, self.manual_ip, True, pygame.Color(self.palette["text"]))
         self.screen.blit(ip_txt, ip_txt.get_rect(center=ip_box.center))
         
         mouse = pygame.mouse.get_pos()
@@ -812,7 +1341,7 @@ class MinesweeperPygameApp:
         w, h = self.screen.get_size()
         
         srv_name = self.selected_server["name"] if self.selected_server else "Local Host"
-        title = self.font_title.render(f"Server Lobbies ({srv_name})", True, pygame.Color(self.palette["text"]))
+        title = _render_text(self.font_title, f"Server Lobbies ({srv_name})", True, pygame.Color(self.palette["text"]))
         self.screen.blit(title, (30, 30))
         
         list_rect = pygame.Rect(30, 80, 360, 260)
@@ -820,7 +1349,7 @@ class MinesweeperPygameApp:
         pygame.draw.rect(self.screen, pygame.Color(self.palette["panel_edge"]), list_rect, width=1, border_radius=10)
         
         if not self.discovered_lobbies:
-            empty_txt = self.font_ui.render("No active rooms. Create one!", True, pygame.Color(self.palette["subtext"]))
+            empty_txt = _render_text(self.font_ui, "No active rooms. Create one!", True, pygame.Color(self.palette["subtext"]))
             self.screen.blit(empty_txt, empty_txt.get_rect(center=list_rect.center))
         else:
             y_offset = list_rect.y + 10
@@ -830,8 +1359,8 @@ class MinesweeperPygameApp:
                 bg = self.palette["tile_hidden_hover"] if lob_rect.collidepoint(mouse) else self.palette["panel_edge"]
                 pygame.draw.rect(self.screen, pygame.Color(bg), lob_rect, border_radius=6)
                 
-                lob_info = self.font_ui.render(f"Room {l['lobby_id']} ({l['difficulty']})", True, pygame.Color(self.palette["text"]))
-                lob_state = self.font_chat.render(f"Players: {l['player_count']} | State: {l['state']}", True, pygame.Color(self.palette["subtext"]))
+                lob_info = _render_text(self.font_ui, f"Room {l['lobby_id']} ({l['difficulty']})", True, pygame.Color(self.palette["text"]))
+                lob_state = _render_text(self.font_chat, f"Players: {l['player_count']} | State: {l['state']}", True, pygame.Color(self.palette["subtext"]))
                 
                 self.screen.blit(lob_info, (lob_rect.x + 10, lob_rect.y + 6))
                 self.screen.blit(lob_state, (lob_rect.x + 10, lob_rect.y + 24))
@@ -840,15 +1369,22 @@ class MinesweeperPygameApp:
                 if y_offset > list_rect.bottom - 50:
                     break
 
-        lbl_create = self.font_ui.render("Create New Room:", True, pygame.Color(self.palette["subtext"]))
+        lbl_create = _render_text(self.font_ui, "Create New Room:", True, pygame.Color(self.palette["subtext"]))
         self.screen.blit(lbl_create, (410, 80))
         
         mouse = pygame.mouse.get_pos()
         self.create_easy_btn = _Button(pygame.Rect(410, 110, 200, 36), "Easy Difficulty", self.font_ui)
         self.create_medium_btn = _Button(pygame.Rect(410, 155, 200, 36), "Medium Difficulty", self.font_ui)
         self.create_hard_btn = _Button(pygame.Rect(410, 200, 200, 36), "Hard Difficulty", self.font_ui)
+        create_btns = [self.create_easy_btn, self.create_medium_btn, self.create_hard_btn]
+        self.create_custom_btn = None
+        d = self.custom_difficulty
+        # Boards larger than a lobby accepts are playable locally only.
+        if d is not None and d.rows <= MAX_ROWS and d.cols <= MAX_COLS:
+            self.create_custom_btn = _Button(pygame.Rect(410, 245, 200, 36), f"Custom {d.rows}x{d.cols}", self.font_ui)
+            create_btns.append(self.create_custom_btn)
         
-        for btn in (self.create_easy_btn, self.create_medium_btn, self.create_hard_btn):
+        for btn in create_btns:
             btn.draw(self.screen, bg=self.palette["panel_edge"], fg=self.palette["text"], border=self.palette["panel_edge"], hover=btn.hit(mouse))
 
         # Bottom controls
@@ -858,8 +1394,9 @@ class MinesweeperPygameApp:
         for btn in (self.lobby_refresh_btn, self.lobby_disconnect_btn):
             btn.draw(self.screen, bg=self.palette["panel"], fg=self.palette["text"], border=self.palette["panel_edge"], hover=btn.hit(mouse))
 
-    def _draw_panel(self):
+    def _draw_panel(self) -> pygame.Rect:
         w, _ = self.screen.get_size()
+        mouse = pygame.mouse.get_pos()
         panel_rect = pygame.Rect(0, 0, w, self.panel_h + self.pad)
         pygame.draw.rect(self.screen, pygame.Color(self.palette["bg"]), panel_rect)
 
@@ -892,22 +1429,23 @@ class MinesweeperPygameApp:
                 hover=self.highscores_btn.hit(mouse),
             )
         else:
-            srv_info = self.font_ui.render(f"Server: {self.selected_server['name'] if self.selected_server else 'Local'}", True, pygame.Color(self.palette["text"]))
-            lobby_info = self.font_ui.render(f"Room: {self.lobby_state['lobby_id'] if self.lobby_state else ''}", True, pygame.Color(self.palette["subtext"]))
+            srv_info = _render_text(self.font_ui, f"Server: {self.selected_server['name'] if self.selected_server else 'Local'}", True, pygame.Color(self.palette["text"]))
+            lobby_info = _render_text(self.font_ui, f"Room: {self.lobby_state['lobby_id'] if self.lobby_state else ''}", True, pygame.Color(self.palette["subtext"]))
             self.screen.blit(srv_info, (self.pad + 14, self.pad + 12))
             self.screen.blit(lobby_info, (self.pad + 14, self.pad + 32))
 
         mine_rect = self._mine_counter_rect()
         pygame.draw.rect(self.screen, pygame.Color("#000000"), mine_rect, border_radius=8)
-        mine_text = self.font_counter.render(self._mine_counter_text(), True, pygame.Color("#ef4444"))
+        mine_text = _render_text(self.font_counter, self._mine_counter_text(), True, pygame.Color("#ef4444"))
         self.screen.blit(mine_text, mine_text.get_rect(center=mine_rect.center))
 
         timer_rect = self._timer_rect()
         pygame.draw.rect(self.screen, pygame.Color("#000000"), timer_rect, border_radius=8)
-        timer_text = self.font_counter.render(f"{self._elapsed_seconds():03d}", True, pygame.Color("#ef4444"))
+        timer_text = _render_text(self.font_counter, f"{self._elapsed_seconds():03d}", True, pygame.Color("#ef4444"))
         self.screen.blit(timer_text, timer_text.get_rect(center=timer_rect.center))
 
         self._draw_smiley()
+        return panel_rect
 
     def _draw_smiley(self):
         rect = self._smiley_rect()
@@ -949,150 +1487,142 @@ class MinesweeperPygameApp:
         else:
             pygame.draw.arc(self.screen, eye_color, mouth_rect, math.radians(200), math.radians(340), 2)
 
-    def _draw_tile(self, r: int, c: int, trigger=None):
+    def _tile_key(self, r: int, c: int):
+        """Hashable description of how a tile looks right now."""
         if self.app_state == "playing_sp":
-            if self.engine is None:
-                return
-
-            ox, oy = self._board_origin()
-            x0 = ox + c * self.tile
-            y0 = oy + r * self.tile
-            rect = pygame.Rect(x0, y0, self.tile, self.tile)
-
-            is_revealed = self.engine.revealed[r][c]
-            is_flag = (r, c) in self.engine.flags
-            is_mine = (r, c) in self.engine.mines
-            is_trigger = trigger is not None and trigger.get("type") == "boom" and trigger.get("trigger") == (r, c)
-
-            if self.engine.game_over and is_mine:
-                bg = self.palette["mine_bg_trigger"] if is_trigger else self.palette["mine_bg"]
-            elif is_revealed:
-                bg = self.palette["tile_revealed"]
-            else:
-                bg = self.palette["tile_hidden"]
-                if self._hover_cell == (r, c):
-                    bg = self.palette["tile_hidden_hover"]
-                if (r, c) in self._pressed_cells:
-                    bg = self.palette["tile_hidden_pressed"]
-
-            pygame.draw.rect(self.screen, pygame.Color(bg), rect)
-            pygame.draw.rect(self.screen, pygame.Color(self.palette["shadow"]), rect, width=1)
-
-            if self.engine.game_over and is_mine:
-                pygame.draw.circle(self.screen, pygame.Color(self.palette["mine"]), rect.center, 6)
-                pygame.draw.line(self.screen, pygame.Color(self.palette["mine"]), (rect.left + 6, rect.centery), (rect.right - 6, rect.centery), 2)
-                pygame.draw.line(self.screen, pygame.Color(self.palette["mine"]), (rect.centerx, rect.top + 6), (rect.centerx, rect.bottom - 6), 2)
-                return
-
-            if not is_revealed and is_flag:
-                pole_color = pygame.Color(self.palette["mine"])
-                flag_color = pygame.Color(self.palette["flag"])
-                pygame.draw.polygon(
-                    self.screen,
-                    flag_color,
-                    [(rect.left + 9, rect.top + 19), (rect.left + 9, rect.top + 7), (rect.left + 19, rect.top + 11)],
-                )
-                pygame.draw.line(self.screen, pole_color, (rect.left + 9, rect.top + 7), (rect.left + 9, rect.top + 21), 2)
-                pygame.draw.line(self.screen, pole_color, (rect.left + 6, rect.top + 21), (rect.left + 14, rect.top + 21), 2)
-                return
-
-            if is_revealed:
-                n = self.engine.adj[r][c]
-                if n > 0:
-                    surf = self.font_num.render(str(n), True, pygame.Color(self._num_color(n)))
-                    self.screen.blit(surf, surf.get_rect(center=(rect.centerx, rect.centery + 1)))
-        
+            engine = self.engine
+            if engine.game_over and engine.is_mine(r, c):
+                return "mine"
+            if engine.is_revealed(r, c):
+                return engine.value(r, c)
+            flag_color = self.palette["flag"] if engine.is_flagged(r, c) else None
         else:
-            if self.lobby_state is None:
-                return
-
-            ox, oy = self._board_origin()
-            x0 = ox + c * self.tile
-            y0 = oy + r * self.tile
-            rect = pygame.Rect(x0, y0, self.tile, self.tile)
-
-            val = None
-            is_revealed = False
-            for rcval in self.lobby_state["revealed_cells"]:
-                if rcval[0] == r and rcval[1] == c:
-                    is_revealed = True
-                    val = rcval[2]
-                    break
-
-            flag_pid = None
-            for flag in self.lobby_state["flags"]:
-                if flag[0] == r and flag[1] == c:
-                    flag_pid = flag[2]
-                    break
-
-            
-            flag_color_hex = "#ef4444"
-            if flag_pid:
-                for player in self.lobby_state["players"]:
-                    if player["id"] == flag_pid:
-                        flag_color_hex = player["color"]
-                        break
-
-            if is_revealed and val == -1:
-                bg = self.palette["mine_bg_trigger"]
-            elif is_revealed:
-                bg = self.palette["tile_revealed"]
-            else:
-                bg = self.palette["tile_hidden"]
-                if self._hover_cell == (r, c):
-                    bg = self.palette["tile_hidden_hover"]
-                if (r, c) in self._pressed_cells:
-                    bg = self.palette["tile_hidden_pressed"]
-
-            pygame.draw.rect(self.screen, pygame.Color(bg), rect)
-            pygame.draw.rect(self.screen, pygame.Color(self.palette["shadow"]), rect, width=1)
-
-            if is_revealed and val == -1:
-                pygame.draw.circle(self.screen, pygame.Color(self.palette["mine"]), rect.center, 6)
-                pygame.draw.line(self.screen, pygame.Color(self.palette["mine"]), (rect.left + 6, rect.centery), (rect.right - 6, rect.centery), 2)
-                pygame.draw.line(self.screen, pygame.Color(self.palette["mine"]), (rect.centerx, rect.top + 6), (rect.centerx, rect.bottom - 6), 2)
-                return
-
-            if not is_revealed and flag_pid:
-                pole_color = pygame.Color(self.palette["mine"])
-                f_color = pygame.Color(flag_color_hex)
-                pygame.draw.polygon(
-                    self.screen,
-                    f_color,
-                    [(rect.left + 9, rect.top + 19), (rect.left + 9, rect.top + 7), (rect.left + 19, rect.top + 11)],
-                )
-                pygame.draw.line(self.screen, pole_color, (rect.left + 9, rect.top + 7), (rect.left + 9, rect.top + 21), 2)
-                pygame.draw.line(self.screen, pole_color, (rect.left + 6, rect.top + 21), (rect.left + 14, rect.top + 21), 2)
-                return
-
-            if is_revealed and val is not None and val > 0:
-                surf = self.font_num.render(str(val), True, pygame.Color(self._num_color(val)))
-                self.screen.blit(surf, surf.get_rect(center=(rect.centerx, rect.centery + 1)))
+            mirror = self.mirror
+            val = mirror.value(r, c)
+            if val is not None:
+                return "mine_hit" if val == -1 else val
+            flag_pid = mirror.flag_owner(r, c)
+            flag_color = mirror.flag_color(flag_pid) if flag_pid else None
+
+        if (r, c) in self._pressed_cells:
+            bg = "pressed"
+        elif self._hover_cell == (r, c):
+            bg = "hover"
+        else:
+            bg = "hidden"
+        return ("flag", flag_color, bg) if flag_color else bg
+
+    def _render_tile(self, key) -> pygame.Surface:
+        """Draws one atlas entry of the board renderer."""
+        surf = pygame.Surface((self.tile, self.tile))
+        rect = surf.get_rect()
+
+        if isinstance(key, int):
+            bg = self.palette["tile_revealed"]
+        elif key == "mine":
+            bg = self.palette["mine_bg"]
+        elif key == "mine_hit":
+            bg = self.palette["mine_bg_trigger"]
+        else:
+            state = key[2] if isinstance(key, tuple) else key
+            bg = {
+                "hidden": self.palette["tile_hidden"],
+                "hover": self.palette["tile_hidden_hover"],
+                "pressed": self.palette["tile_hidden_pressed"],
+            }[state]
+
+        pygame.draw.rect(surf, pygame.Color(bg), rect)
+        pygame.draw.rect(surf, pygame.Color(self.palette["shadow"]), rect, width=1)
+
+        if key in ("mine", "mine_hit"):
+            pygame.draw.circle(surf, pygame.Color(self.palette["mine"]), rect.center, 6)
+            pygame.draw.line(surf, pygame.Color(self.palette["mine"]), (rect.left + 6, rect.centery), (rect.right - 6, rect.centery), 2)
+            pygame.draw.line(surf, pygame.Color(self.palette["mine"]), (rect.centerx, rect.top + 6), (rect.centerx, rect.bottom - 6), 2)
+        elif isinstance(key, tuple):
+            pole_color = pygame.Color(self.palette["mine"])
+            pygame.draw.polygon(
+                surf,
+                pygame.Color(key[1]),
+                [(rect.left + 9, rect.top + 19), (rect.left + 9, rect.top + 7), (rect.left + 19, rect.top + 11)],
+            )
+            pygame.draw.line(surf, pole_color, (rect.left + 9, rect.top + 7), (rect.left + 9, rect.top + 21), 2)
+            pygame.draw.line(surf, pole_color, (rect.left + 6, rect.top + 21), (rect.left + 14, rect.top + 21), 2)
+        elif isinstance(key, int) and key > 0:
+            num = _render_text(self.font_num, str(key), True, pygame.Color(self._num_color(key)))
+            surf.blit(num, num.get_rect(center=(rect.centerx, rect.centery + 1)))
+        return surf
+
+    def _build_overview_palette(self) -> tuple[bytes, bytes, bytes]:
+        """Translate tables from VIEW_* codes to the R, G and B of an overview pixel."""
+        colors = [pygame.Color(self.palette["mine"])] * 256
+        colors[0] = pygame.Color(self.palette["tile_revealed"])
+        for n in range(1, 9):
+            colors[n] = pygame.Color(self._num_color(n))
+        colors[VIEW_MINE] = pygame.Color(self.palette["mine"])
+        colors[VIEW_HIDDEN] = pygame.Color(self.palette["tile_hidden"])
+        colors[VIEW_FLAG] = pygame.Color(self.palette["flag"])
+        return tuple(bytes(color[k] for color in colors) for k in range(3))
+
+    def _overview_version(self):
+        if self.app_state == "playing_sp":
+            engine = self.engine
+            return id(engine), engine.revealed_count, engine.flag_count, engine.game_over
+        return id(self.mirror), self.mirror.version
 
-    def _draw_board(self):
+    def _overview_pixels(self) -> bytearray:
+        """The whole board as packed RGB, one pixel per cell."""
         if self.app_state == "playing_sp":
-            if self.engine is None:
-                return
-            for r in range(self.engine.rows):
-                for c in range(self.engine.cols):
-                    self._draw_tile(r, c)
+            codes = bytes(self.engine.view_codes(show_mines=self.engine.game_over))
         else:
-            if self.lobby_state is None:
-                return
-            for r in range(self.lobby_state["rows"]):
-                for c in range(self.lobby_state["cols"]):
-                    self._draw_tile(r, c)
-
-    def _draw_sidebar(self):
+            codes = self.mirror.view_codes()
+        red, green, blue = self._overview_palette
+        pixels = bytearray(3 * len(codes))
+        pixels[0::3] = codes.translate(red)
+        pixels[1::3] = codes.translate(green)
+        pixels[2::3] = codes.translate(blue)
+        return pixels
+
+    def _draw_board(self, full: bool) -> list[pygame.Rect]:
+        """Brings the retained board view up to date and copies what changed to the screen."""
+        if self.app_state == "playing_mp" and self.mirror is None:
+            return []
+        dims = self._board_dims()
+        if dims is None:
+            return []
+        rows, cols = dims
+        self._sync_camera()
+        view_rect = self._board_view_rect()
+        view = (self._zoom, self._cam_x, self._cam_y, view_rect.width, view_rect.height, rows, cols)
+
+        renderer = self._board_renderer
+        if self._zoom < renderer.OVERVIEW_TILE:
+            changed = [renderer.surface.get_rect()] if renderer.update_overview(
+                self._overview_pixels, self._overview_version(), view) else []
+        else:
+            changed = renderer.update(self._tile_key, view)
+
+        if full:
+            self.screen.blit(renderer.surface, view_rect)
+            return [view_rect]
+        dirty = []
+        for rect in changed:
+            self.screen.blit(renderer.surface, (view_rect.x + rect.x, view_rect.y + rect.y), rect)
+            dirty.append(rect.move(view_rect.topleft))
+        return dirty
+
+    def _draw_sidebar(self) -> pygame.Rect | None:
         """Draws the multiplayer sidebar containing Player List, Chat logs, and input boxes."""
         if not self.lobby_state:
-            return
+            return None
 
         w, h = self.screen.get_size()
-        board_w = self.lobby_state["cols"] * self.tile
+        board_w, _ = self._view_size()
         sidebar_x = self.pad * 2 + board_w
         sidebar_w = w - sidebar_x - self.pad
         sidebar_h = h - self.pad * 2
+
+        column = pygame.Rect(sidebar_x - self.pad, 0, w - sidebar_x + self.pad, h)
+        self.screen.fill(pygame.Color(self.palette["bg"]), column)
         
         sidebar_rect = pygame.Rect(sidebar_x, self.pad, sidebar_w, sidebar_h)
         pygame.draw.rect(self.screen, pygame.Color(self.palette["panel"]), sidebar_rect, border_radius=14)
@@ -1100,11 +1630,11 @@ class MinesweeperPygameApp:
 
         # Draw Lobby details
         y = sidebar_rect.y + 14
-        room_title = self.font_title.render("MULTIPLAYER", True, pygame.Color(self.palette["text"]))
+        room_title = _render_text(self.font_title, "MULTIPLAYER", True, pygame.Color(self.palette["text"]))
         self.screen.blit(room_title, (sidebar_rect.x + 14, y))
         y += 30
 
-        room_state = self.font_chat.render(f"Lobby State: {self.lobby_state['state'].upper()}", True, pygame.Color(self.palette["subtext"]))
+        room_state = _render_text(self.font_chat, f"Lobby State: {self.lobby_state['state'].upper()}", True, pygame.Color(self.palette["subtext"]))
         self.screen.blit(room_state, (sidebar_rect.x + 14, y))
         y += 20
 
@@ -1112,15 +1642,15 @@ class MinesweeperPygameApp:
             me_player = next((p for p in self.lobby_state["players"] if p["id"] == self.player_id), None)
             is_host = me_player and me_player.get("is_host", False)
             if is_host:
-                lbl_start = self.font_ui.render("Press 'S' or click button to START", True, pygame.Color("#fbbf24"))
+                lbl_start = _render_text(self.font_ui, "Press 'S' or click button to START", True, pygame.Color("#fbbf24"))
                 self.screen.blit(lbl_start, (sidebar_rect.x + 14, y))
             else:
-                lbl_start = self.font_ui.render("Waiting for Host to start...", True, pygame.Color(self.palette["subtext"]))
+                lbl_start = _render_text(self.font_ui, "Waiting for Host to start...", True, pygame.Color(self.palette["subtext"]))
                 self.screen.blit(lbl_start, (sidebar_rect.x + 14, y))
             y += 24
 
         y = max(y, sidebar_rect.y + 80)
-        lbl_scores = self.font_ui.render("SCOREBOARD:", True, pygame.Color(self.palette["text"]))
+        lbl_scores = _render_text(self.font_ui, "SCOREBOARD:", True, pygame.Color(self.palette["text"]))
         self.screen.blit(lbl_scores, (sidebar_rect.x + 14, y))
         pygame.draw.line(self.screen, pygame.Color(self.palette["panel_edge"]), (sidebar_rect.x + 14, y + 22), (sidebar_rect.right - 14, y + 22), 1)
         y += 28
@@ -1140,16 +1670,17 @@ class MinesweeperPygameApp:
                 name_str += " [OUT]"
 
             color = self.palette["text"]
-            if p["stunned_seconds"] > 0:
+            stun_left = self._stun_left(p)
+            if stun_left > 0:
                 color = "#f87171"
-                name_str += f" (Stun {math.ceil(p['stunned_seconds'])}s)"
+                name_str += f" (Stun {math.ceil(stun_left)}s)"
             elif not p["connected"]:
                 color = "#4b5563"
 
-            p_surf = self.font_ui.render(name_str, True, pygame.Color(color))
+            p_surf = _render_text(self.font_ui, name_str, True, pygame.Color(color))
             self.screen.blit(p_surf, (sidebar_x + 32, y))
 
-            score_surf = self.font_ui.render(str(p["score"]), True, pygame.Color(self.palette["text"]))
+            score_surf = _render_text(self.font_ui, str(p["score"]), True, pygame.Color(self.palette["text"]))
             self.screen.blit(score_surf, (sidebar_rect.right - 16 - score_surf.get_width(), y))
 
             y += 24
@@ -1158,7 +1689,7 @@ class MinesweeperPygameApp:
 
         # CHAT BOX (Height: 120px)
         y = sidebar_rect.bottom - 190
-        lbl_chat = self.font_ui.render("Lobby Chat:", True, pygame.Color(self.palette["subtext"]))
+        lbl_chat = _render_text(self.font_ui, "Lobby Chat:", True, pygame.Color(self.palette["subtext"]))
         self.screen.blit(lbl_chat, (sidebar_rect.x + 14, y))
         y += 20
 
@@ -1179,7 +1710,7 @@ class MinesweeperPygameApp:
                 col = self.palette["text"]
                 full_msg = f"{sender}: {text}"
                 
-            msg_surf = self.font_chat.render(full_msg, True, pygame.Color(col))
+            msg_surf = _render_text(self.font_chat, full_msg, True, pygame.Color(col))
             self.screen.blit(msg_surf, (chat_box_rect.x + 8, chat_y))
             chat_y += 16
 
@@ -1197,7 +1728,7 @@ class MinesweeperPygameApp:
             in_text = "Press Enter to chat..." if not self.editing_chat else "Typing..."
         
         in_color = self.palette["text"] if self.chat_input else self.palette["subtext"]
-        in_surf = self.font_chat.render(in_text, True, pygame.Color(in_color))
+        in_surf = _render_text(self.font_chat, in_text, True, pygame.Color(in_color))
         self.screen.blit(in_surf, (chat_input_box.x + 8, chat_input_box.y + 6))
 
         mouse = pygame.mouse.get_pos()
@@ -1215,6 +1746,7 @@ class MinesweeperPygameApp:
         elif self.lobby_state["game_over"]:
             self.mp_restart_btn = _Button(pygame.Rect(sidebar_rect.right - 110, y, 100, 24), "Restart Game", self.font_chat)
             self.mp_restart_btn.draw(self.screen, bg="#16a34a", fg="#ffffff", border=self.palette["panel_edge"], hover=self.mp_restart_btn.hit(mouse))
+        return column
 
     def _draw_overlay(self):
         if self._overlay is None:
@@ -1233,7 +1765,8 @@ class MinesweeperPygameApp:
         if not self.lobby_state:
             return
         me = next((p for p in self.lobby_state["players"] if p["id"] == self.player_id), None)
-        if not me or me["stunned_seconds"] <= 0:
+        stun_left = self._stun_left(me) if me else 0.0
+        if stun_left <= 0:
             return
 
         w, h = self.screen.get_size()
@@ -1241,12 +1774,11 @@ class MinesweeperPygameApp:
         pygame.draw.rect(border_surf, (239, 68, 68, 40), (0, 0, w, h), width=8)
         self.screen.blit(border_surf, (0, 0))
 
-        stun_msg = f"EXPLODED! STUNNED: {math.ceil(me['stunned_seconds'])}s"
-        surf = self.font_title.render(stun_msg, True, pygame.Color("#ef4444"))
+        stun_msg = f"EXPLODED! STUNNED: {math.ceil(stun_left)}s"
+        surf = _render_text(self.font_title, stun_msg, True, pygame.Color("#ef4444"))
         
         ox, oy = self._board_origin()
-        board_w = self.lobby_state["cols"] * self.tile
-        board_h = self.lobby_state["rows"] * self.tile
+        board_w, board_h = self._view_size()
         
         box_rect = pygame.Rect(ox + (board_w - surf.get_width()) // 2 - 10, oy + board_h // 2 - 20, surf.get_width() + 20, 40)
         pygame.draw.rect(self.screen, pygame.Color(self.palette["panel"]), box_rect, border_radius=8)
@@ -1257,6 +1789,8 @@ class MinesweeperPygameApp:
     def _handle_event(self, e: pygame.event.Event):
         if e.type == pygame.QUIT:
             self.disconnect_tcp()
+            if self.debug:
+                print(f"[UI] Text cache: {_text_cache.summary()}")
             raise SystemExit
 
         if self._overlay is not None:
@@ -1360,11 +1894,13 @@ class MinesweeperPygameApp:
             pos = e.pos
             
             if self.create_easy_btn.hit(pos):
-                self.create_lobby_via_http("Easy")
+                self.create_lobby_via_http(self.difficulties[0])
             elif self.create_medium_btn.hit(pos):
-                self.create_lobby_via_http("Medium")
+                self.create_lobby_via_http(self.difficulties[1])
             elif self.create_hard_btn.hit(pos):
-                self.create_lobby_via_http("Hard")
+                self.create_lobby_via_http(self.difficulties[2])
+            elif self.create_custom_btn is not None and self.create_custom_btn.hit(pos):
+                self.create_lobby_via_http(self.custom_difficulty)
             
             elif self.lobby_refresh_btn.hit(pos):
                 self.fetch_lobbies_via_http()
@@ -1384,6 +1920,8 @@ class MinesweeperPygameApp:
                     y_offset += 55
 
     def _handle_event_sp(self, e: pygame.event.Event):
+        if self._handle_view_event(e):
+            return
         if e.type == pygame.KEYDOWN:
             if e.key in (pygame.K_ESCAPE, pygame.K_F2):
                 self.new_game(self.difficulties[self.difficulty_index])
@@ -1396,6 +1934,9 @@ class MinesweeperPygameApp:
             elif e.key in (pygame.K_3, pygame.K_KP3) and len(self.difficulties) >= 3:
                 self.difficulty_index = 2
                 self.new_game(self.difficulties[2])
+            elif e.key in (pygame.K_4, pygame.K_KP4) and len(self.difficulties) >= 4:
+                self.difficulty_index = 3
+                self.new_game(self.difficulties[3])
 
         if e.type == pygame.MOUSEMOTION:
             self._hover_cell = self._cell_from_pos(e.pos)
@@ -1432,6 +1973,8 @@ class MinesweeperPygameApp:
     def _handle_event_mp(self, e: pygame.event.Event):
         if not self.lobby_state:
             return
+        if not self.editing_chat and self._handle_view_event(e):
+            return
 
         if e.type == pygame.KEYDOWN:
             if self.editing_chat:
@@ -1468,7 +2011,7 @@ class MinesweeperPygameApp:
                 return
 
             w, h = self.screen.get_size()
-            board_w = self.lobby_state["cols"] * self.tile
+            board_w, _ = self._view_size()
             sidebar_x = self.pad * 2 + board_w
             
             y = h - self.pad - 28
@@ -1500,50 +2043,93 @@ class MinesweeperPygameApp:
                 self._handle_board_mouse_up(e.button, e.pos)
 
     def run(self):
+        """Main loop: sleeps until input, a state update or a countdown tick, then redraws."""
+        self._notify_redraw()
         while True:
-            self.clock.tick(60)
+            timeout = self._next_wakeup_ms()
+            first = pygame.event.wait(timeout) if timeout is not None else pygame.event.wait()
 
-            for e in pygame.event.get():
-                self._handle_event(e)
+            for e in [first, *pygame.event.get()]:
+                if e.type == NET_UPDATE:
+                    self._net_update_pending = False
+                elif e.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                    self._full_redraw = True
+                elif e.type != pygame.NOEVENT:
+                    self._handle_event(e)
 
             if self._overlay is not None and self._overlay.closed:
                 self._overlay = None
                 self._overlay_ok_rect = None
+                self._full_redraw = True
 
+            dirty = None
+            if self.app_state in ("menu", "browser", "lobby_room"):
+                self._rendered_view = None
             if self.app_state == "menu":
                 self._draw_menu()
             elif self.app_state == "browser":
                 self._draw_browser()
             elif self.app_state == "lobby_room":
                 self._draw_lobby()
-            elif self.app_state == "playing_sp":
-                if self.engine is not None and self.engine.game_over and self._smiley_state == "idle":
-                    self._smiley_state = "win" if self.engine.won else "lose"
-
-                self.screen.fill(pygame.Color(self.palette["bg"]))
-                self._draw_panel()
-                self._draw_board()
-            elif self.app_state == "playing_mp":
-                # Multiplayer Gameplay state
-                self.screen.fill(pygame.Color(self.palette["bg"]))
-                if self.lobby_state is None:
-                    lbl_load = self.font_title.render("Loading room state...", True, pygame.Color(self.palette["text"]))
-                    self.screen.blit(lbl_load, lbl_load.get_rect(center=self.screen.get_rect().center))
-                else:
-                    expected_w, expected_h = self._window_size_for_mp()
-                    curr_w, curr_h = self.screen.get_size()
-                    if curr_w != expected_w or curr_h != expected_h:
-                        self.screen = pygame.display.set_mode((expected_w, expected_h))
-                    self._draw_panel()
-                    self._draw_board()
-                    self._draw_sidebar()
-                    self._draw_stun_overlay()
+            else:
+                dirty = self._draw_game()
 
             if self._overlay is not None:
                 self._draw_overlay()
+                dirty = None
 
-            pygame.display.flip()
+            if dirty is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(dirty)
 
+            # Caps the frame rate while input (e.g. mouse motion) keeps arriving.
+            self.clock.tick(60)
+
+    def _draw_game(self) -> list[pygame.Rect] | None:
+        """Draws a single or multiplayer game frame.
 
-def run():
-    MinesweeperPygameApp().run()
\ No newline at end of file
+        Returns the screen rectangles that changed, or None after a full
+        repaint. Only the panel, the sidebar and board tiles whose look changed
+        are redrawn, unless something covering the board (a resize, the stun
+        border, a dialog) forces a full repaint.
+        """
+        if self.app_state == "playing_sp":
+            if self.engine is not None and self.engine.game_over and self._smiley_state == "idle":
+                self._smiley_state = "win" if self.engine.won else "lose"
+            stunned = False
+        else:
+            if self.lobby_state is None:
+                self.screen.fill(pygame.Color(self.palette["bg"]))
+                lbl_load = _render_text(self.font_title, "Loading room state...", True, pygame.Color(self.palette["text"]))
+                self.screen.blit(lbl_load, lbl_load.get_rect(center=self.screen.get_rect().center))
+                self._full_redraw = True
+                return None
+            expected_w, expected_h = self._window_size_for_mp()
+            curr_w, curr_h = self.screen.get_size()
+            if curr_w != expected_w or curr_h != expected_h:
+                self.screen = pygame.display.set_mode((expected_w, expected_h))
+            me = next((p for p in self.lobby_state["players"] if p["id"] == self.player_id), None)
+            stunned = bool(me and self._stun_left(me) > 0)
+
+        view = (self.app_state, self.screen.get_size())
+        full = (self._full_redraw or self._overlay is not None or view != self._rendered_view
+                or stunned or self._stun_shown)
+        self._full_redraw = False
+        self._rendered_view = view
+        self._stun_shown = stunned
+
+        if full:
+            self.screen.fill(pygame.Color(self.palette["bg"]))
+        dirty = [self._draw_panel()]
+        dirty += self._draw_board(full)
+        if self.app_state == "playing_mp":
+            sidebar = self._draw_sidebar()
+            if sidebar is not None:
+                dirty.append(sidebar)
+            self._draw_stun_overlay()
+        return None if full else dirty
+
+
+def run(custom: Difficulty | None = None, debug: bool = False):
+    MinesweeperPygameApp(custom, debug).run()
\ No newline at end of file